@@ -10,14 +10,14 @@ router = APIRouter()
 async def get_all_detections():
     """Get all detections with frame capture information"""
     try:
-        response = supabase_client.client.table('detections')\
+        query = supabase_client.client.table('detections')\
             .select('''
                 *,
                 brands(name),
                 frame_captures(public_url, path, frame_number)
             ''')\
-            .order('created_at', desc=True)\
-            .execute()
+            .order('created_at', desc=True)
+        response = await supabase_client.execute(query)
         
         # Transform the response to include brand names and frame URLs
         detections = []
@@ -48,14 +48,14 @@ async def get_all_detections():
 async def get_detections(file_id: int):
     """Get all detections for a file with frame capture information"""
     try:
-        response = supabase_client.client.table('detections')\
+        query = supabase_client.client.table('detections')\
             .select('''
                 *,
                 brands(name),
                 frame_captures(public_url, path, frame_number)
             ''')\
-            .eq('file_id', file_id)\
-            .execute()
+            .eq('file_id', file_id)
+        response = await supabase_client.execute(query)
         
         # Transform the response to include brand names and frame URLs
         detections = []
@@ -86,10 +86,10 @@ async def get_detections(file_id: int):
 async def get_predictions(file_id: int):
     """Get all predictions for a file"""
     try:
-        response = supabase_client.client.table('predictions')\
+        query = supabase_client.client.table('predictions')\
             .select('*, brands(name)')\
-            .eq('video_id', file_id)\
-            .execute()
+            .eq('video_id', file_id)
+        response = await supabase_client.execute(query)
         
         return {"predictions": response.data}
     except Exception as e:
@@ -100,10 +100,10 @@ async def get_predictions(file_id: int):
 async def get_files():
     """Get all processed files"""
     try:
-        response = supabase_client.client.table('files')\
+        query = supabase_client.client.table('files')\
             .select('*')\
-            .order('created_at', desc=True)\
-            .execute()
+            .order('created_at', desc=True)
+        response = await supabase_client.execute(query)
         
         return {"files": response.data}
     except Exception as e:
@@ -114,11 +114,11 @@ async def get_files():
 async def get_frame_captures(file_id: int):
     """Get all frame captures for a file"""
     try:
-        response = supabase_client.client.table('frame_captures')\
+        query = supabase_client.client.table('frame_captures')\
             .select('*')\
             .eq('file_id', file_id)\
-            .order('frame_number')\
-            .execute()
+            .order('frame_number')
+        response = await supabase_client.execute(query)
         
         return {"frame_captures": response.data}
     except Exception as e:
@@ -129,10 +129,10 @@ async def get_frame_captures(file_id: int):
 async def get_all_frame_captures():
     """Get all frame captures"""
     try:
-        response = supabase_client.client.table('frame_captures')\
+        query = supabase_client.client.table('frame_captures')\
             .select('*')\
-            .order('created_at', desc=True)\
-            .execute()
+            .order('created_at', desc=True)
+        response = await supabase_client.execute(query)
         
         return {"frame_captures": response.data}
     except Exception as e:
@@ -0,0 +1,152 @@
+import bisect
+import heapq
+import logging
+from typing import Callable, Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from backend.core.video_processor import video_processor, FrameReader, VideoProbe
+from backend.core.config import ADAPTIVE_MIN_FPS, ADAPTIVE_MAX_FPS, INFERENCE_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+class AdaptiveSampler:
+    """
+    Sample a video sparsely and densify around detections
+    Frames are first taken at min_fps. Whenever two neighbouring samples disagree on which
+    brands are visible, the frame halfway between them is sampled too, until the gap is down
+    to 1/max_fps. Appearance edges (and therefore first/last detection times) end up as
+    precise as a max_fps pass while empty stretches only cost min_fps inferences.
+    Because refinement goes back in time, each yielded batch also records a settled timestamp
+    (pop_settled_timestamp): no frame before it will be sampled any more. sample_interval gives
+    the sampling step a frame was taken at, i.e. the stretch of video it stands for.
+    """
+
+    def __init__(self, min_fps: float = ADAPTIVE_MIN_FPS, max_fps: float = ADAPTIVE_MAX_FPS,
+                 batch_size: int = INFERENCE_BATCH_SIZE):
+        self.min_fps = min_fps
+        self.max_fps = max(max_fps, min_fps)
+        self.batch_size = max(1, batch_size)
+        self.frames_sampled = 0
+        self.frames_refined = 0
+        self.sparse_interval = 0
+        self.dense_interval = 0
+        self.fps = 0.0
+        self._intervals = {}  # position -> sampling step in frames
+        self._settled = {}  # first position of a yielded batch -> settled timestamp
+
+    def iter_results(self, video_path: str, detect: Callable[[List[np.ndarray]], List[List[Dict]]],
+                     probe: VideoProbe = None) -> Iterator[Tuple[List, List]]:
+        """
+        Yield (batch, batch_detections) where batch holds (frame_index, timestamp, frame)
+        Positions within a batch are ascending, but refinement batches may go back in time
+        With a probe, its already open capture is used (and left open)
+        """
+        reader = FrameReader(video_path, probe.cap if probe is not None else None)
+        try:
+            fps = self.fps = reader.fps
+            self.dense_interval = video_processor.get_frame_interval(fps, self.max_fps)
+            sparse = video_processor.get_frame_interval(fps, self.min_fps)
+            # Keep sparse samples on the dense grid so refinement never lands next to one
+            self.sparse_interval = max(self.dense_interval, sparse // self.dense_interval * self.dense_interval)
+
+            heap = []
+            scheduled = set()
+            sampled_positions = []
+            sampled_brands = {}
+            next_sparse = 0
+            end_position = None
+
+            def schedule(position: int, interval: int) -> bool:
+                if position in scheduled or position < 0:
+                    return False
+                if end_position is not None and position >= end_position:
+                    return False
+                scheduled.add(position)
+                self._intervals[position] = interval
+                heapq.heappush(heap, position)
+                return True
+
+            while True:
+                # Keep a batch worth of sparse positions queued ahead of refinement work
+                while len(heap) < self.batch_size and (end_position is None or next_sparse < end_position):
+                    schedule(next_sparse, self.sparse_interval)
+                    next_sparse += self.sparse_interval
+                if not heap:
+                    break
+
+                positions = [heapq.heappop(heap) for _ in range(min(self.batch_size, len(heap)))]
+                batch = []
+                for position in positions:
+                    if end_position is not None and position >= end_position:
+                        continue
+                    frame = reader.read(position)
+                    if frame is None:
+                        end_position = position if end_position is None else min(end_position, position)
+                        continue
+                    timestamp = position / fps if fps > 0 else 0.0
+                    batch.append((position, timestamp, frame))
+                if not batch:
+                    continue
+
+                batch_detections = detect([frame for _, _, frame in batch])
+                self.frames_sampled += len(batch)
+
+                # Refine between every new sample and its neighbours when their brands differ
+                for (position, _, _), detections in zip(batch, batch_detections):
+                    sampled_brands[position] = frozenset(d['class_name'] for d in detections)
+                    bisect.insort(sampled_positions, position)
+
+                for position, _, _ in batch:
+                    index = bisect.bisect_left(sampled_positions, position)
+                    for neighbour_index in (index - 1, index + 1):
+                        if 0 <= neighbour_index < len(sampled_positions):
+                            neighbour = sampled_positions[neighbour_index]
+                            if sampled_brands[neighbour] != sampled_brands[position]:
+                                self._schedule_midpoint(min(position, neighbour), max(position, neighbour), schedule)
+
+                # Every later sample lies after the earliest pending position, and refinement only
+                # lands between a sample and its neighbour, so nothing before that position's
+                # sampled predecessor can be sampled again
+                pending = [heap[0]] if heap else []
+                if end_position is None or next_sparse < end_position:
+                    pending.append(next_sparse)
+                if pending:
+                    index = bisect.bisect_left(sampled_positions, min(pending))
+                    settled = sampled_positions[index - 1] if index > 0 else 0
+                else:
+                    settled = sampled_positions[-1] if sampled_positions else 0
+                self._settled[batch[0][0]] = settled / fps if fps > 0 else 0.0
+                yield batch, batch_detections
+        finally:
+            if probe is None:
+                reader.release()
+
+        logger.info(f"Adaptive sampling: {self.stats()}")
+
+    def _schedule_midpoint(self, start: int, end: int, schedule: Callable[[int], bool]):
+        """Schedule the dense-grid frame halfway between two samples, if there is room for one"""
+        if end - start <= self.dense_interval:
+            return
+        midpoint = round((start + end) / 2 / self.dense_interval) * self.dense_interval
+        if start < midpoint < end and schedule(midpoint, (end - start) // 2):
+            self.frames_refined += 1
+
+    def sample_interval(self, position: int) -> float:
+        """Seconds of video a sampled frame stands for (its sampling step)"""
+        interval = self._intervals.get(position, self.sparse_interval)
+        return interval / self.fps if self.fps > 0 else 0.0
+
+    def pop_settled_timestamp(self, batch: List) -> float:
+        """Timestamp before which no frame is sampled after this batch (batches in yield order)"""
+        return self._settled.pop(batch[0][0], 0.0)
+
+    def stats(self) -> Dict:
+        return {
+            'min_fps': self.min_fps,
+            'max_fps': self.max_fps,
+            'sparse_interval': self.sparse_interval,
+            'dense_interval': self.dense_interval,
+            'frames_sampled': self.frames_sampled,
+            'frames_refined': self.frames_refined
+        }
@@ -7,22 +7,99 @@ load_dotenv()
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 SUPABASE_SERVICE_ROLE = os.getenv("SUPABASE_SERVICE_ROLE")
+SUPABASE_IO_WORKERS = int(os.getenv("SUPABASE_IO_WORKERS", "8"))  # Threads running blocking Supabase HTTP calls
+DB_INSERT_CHUNK_SIZE = int(os.getenv("DB_INSERT_CHUNK_SIZE", "500"))  # Rows per bulk insert request
+DB_INSERT_MAX_RETRIES = int(os.getenv("DB_INSERT_MAX_RETRIES", "3"))  # Retries of a bulk insert that could not connect (never sent, so no duplicates)
+DB_INSERT_RETRY_BASE_DELAY = float(os.getenv("DB_INSERT_RETRY_BASE_DELAY", "0.5"))  # Seconds, doubled on every retry
 
 # Model Configuration
 MODEL_PATH = "best.pt"
 CONFIDENCE_THRESHOLD = 0.5
+INFERENCE_BATCH_SIZE = int(os.getenv("INFERENCE_BATCH_SIZE", "8"))  # Frames per model call
+MODEL_INPUT_SIZE = 640  # Long side of the model input
+
+# Inference profiles selectable per upload ("fast", "accurate;brands=nike,adidas", ...)
+INFERENCE_PROFILES = {
+    "default": {"imgsz": MODEL_INPUT_SIZE, "conf": CONFIDENCE_THRESHOLD, "max_det": 300},
+    "fast": {"imgsz": 480, "conf": 0.5, "max_det": 50},
+    "accurate": {"imgsz": 960, "conf": 0.35, "max_det": 300}
+}
+DEFAULT_INFERENCE_PROFILE = os.getenv("DEFAULT_INFERENCE_PROFILE", "default")
+
+INFERENCE_THREADS = int(os.getenv("INFERENCE_THREADS", "0"))  # torch intra-op threads (0: torch default)
+INFERENCE_INTEROP_THREADS = int(os.getenv("INFERENCE_INTEROP_THREADS", "0"))  # torch inter-op threads (0: torch default)
+OPENCV_THREADS = int(os.getenv("OPENCV_THREADS", "-1"))  # cv2.setNumThreads (-1: OpenCV default, 0: no threading)
+CPU_AFFINITY = os.getenv("CPU_AFFINITY", "")  # Pin the API process to these cores, e.g. "0-3"
+PIN_WORKERS = os.getenv("PIN_WORKERS", "false").lower() == "true"  # Give each segment worker its own slice of cores
+INFERENCE_SCHEDULER_ENABLED = os.getenv("INFERENCE_SCHEDULER_ENABLED", "true").lower() == "true"  # Batch frames across concurrent jobs
+SCHEDULER_MAX_BATCH_SIZE = int(os.getenv("SCHEDULER_MAX_BATCH_SIZE", "16"))  # Frames per scheduled model call
+SCHEDULER_MAX_WAIT_MS = float(os.getenv("SCHEDULER_MAX_WAIT_MS", "5"))  # Longest a frame waits for others to join its batch
+MODEL_FALLBACK_PATH = "yolov8n.pt"  # Used when MODEL_PATH can't be loaded
+MODEL_ALLOW_DOWNLOAD_FALLBACK = os.getenv("MODEL_ALLOW_DOWNLOAD_FALLBACK", "false").lower() == "true"  # Download the fallback if missing
+MODEL_LOAD_ON_STARTUP = os.getenv("MODEL_LOAD_ON_STARTUP", "true").lower() == "true"  # Otherwise load on first request
+MODEL_WARMUP_RUNS = int(os.getenv("MODEL_WARMUP_RUNS", "1"))  # Blank inferences run right after loading
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "pytorch")  # pytorch, onnx or openvino (exported next to the .pt)
+MODEL_QUANTIZATION = os.getenv("MODEL_QUANTIZATION", "none")  # none, dynamic or static INT8 (runs on the onnx backend)
+QUANTIZATION_CALIBRATION_DIR = os.getenv("QUANTIZATION_CALIBRATION_DIR", "calibration_frames")  # Our own frames for static INT8
+QUANTIZATION_CALIBRATION_SIZE = 200  # Calibration images used at most
+
+# Detection result cache keyed by image content, model version and inference settings
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "true").lower() == "true"
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "4096"))  # Images/frames kept in memory
+RESULT_CACHE_DIR = os.getenv("RESULT_CACHE_DIR", "")  # Set to a directory to enable the on-disk tier
+
+# Detector cascade: a cheap screening pass decides which frames go to the full model
+CASCADE_ENABLED = os.getenv("CASCADE_ENABLED", "false").lower() == "true"
+CASCADE_SCREEN_MODEL = os.getenv("CASCADE_SCREEN_MODEL", "")  # Small screening model; empty: low-resolution pass of the main model
+CASCADE_SCREEN_SIZE = 320  # Input size of the low-resolution screening pass
+CASCADE_SCREEN_THRESHOLD = 0.1  # Frames with any screening box above this go to the full model
+CASCADE_AUDIT_RATE = 0.05  # Share of rejected frames still run through the full model to estimate recall loss
+
+# Tiled inference for small logos in high-resolution frames (needs full-resolution frames, i.e. no DECODE_DOWNSCALE)
+TILED_INFERENCE = os.getenv("TILED_INFERENCE", "false").lower() == "true"
+TILING_MIN_SIDE = int(os.getenv("TILING_MIN_SIDE", "1280"))  # Only frames whose long side exceeds this are tiled
+TILE_SIZE = 640  # Tile side in original pixels
+TILE_OVERLAP = 0.2  # Fraction of a tile shared with its neighbour
+TILE_MERGE_THRESHOLD = 0.6  # Intersection over the smaller box above which cross-tile boxes are merged
 
 # File Configuration
 UPLOAD_DIR = "uploads"
-FRAMES_DIR = "frames"
-CROPS_DIR = "crops"
 MAX_FILE_SIZE = 100 * 1024 * 1024  # 100MB
 
 # Video Processing Configuration
+VIDEO_METADATA_CACHE_DIR = os.getenv("VIDEO_METADATA_CACHE_DIR", "cache/video_metadata")  # Empty disables the disk tier
+VIDEO_METADATA_CACHE_SIZE = 256  # Entries kept in memory
 TARGET_FPS = 1  # Extract 1 frame per second
+FRAME_SAMPLING_STRATEGY = os.getenv("FRAME_SAMPLING_STRATEGY", "auto")  # auto, read, grab or seek
+FRAME_SEEK_MIN_INTERVAL = 250  # Seek instead of grab when sampled frames are further apart (~1 GOP)
+DECODE_DOWNSCALE = os.getenv("DECODE_DOWNSCALE", "false").lower() == "true"  # Letterbox frames to MODEL_INPUT_SIZE at decode time (fixed sampling only)
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "4"))  # Batches buffered between pipeline stages
+SAMPLING_MODE = os.getenv("SAMPLING_MODE", "fixed")  # fixed (TARGET_FPS) or adaptive
+ADAPTIVE_MIN_FPS = float(os.getenv("ADAPTIVE_MIN_FPS", "0.5"))  # Base rate of the adaptive sampler
+ADAPTIVE_MAX_FPS = float(os.getenv("ADAPTIVE_MAX_FPS", "4"))  # Finest rate used around detections
+VIDEO_WORKERS = int(os.getenv("VIDEO_WORKERS", "1"))  # >1 processes video segments in parallel worker processes
+VIDEO_SEGMENT_SECONDS = 60  # Target length of each video segment in parallel mode
+SEGMENT_BUFFER_MB = int(os.getenv("SEGMENT_BUFFER_MB", "1024"))  # Full-resolution frames in-flight segments may hold (parallel mode)
+
+# Cross-frame tracking
+TRACKING_ENABLED = os.getenv("TRACKING_ENABLED", "true").lower() == "true"  # Persist one record per track
+PERSIST_FRAME_DETECTIONS = os.getenv("PERSIST_FRAME_DETECTIONS", "false").lower() == "true"  # Also keep per-frame records
+TRACKER_IOU_THRESHOLD = 0.3  # Minimum box overlap to continue a track
+TRACKER_MAX_CENTROID_DISTANCE = 0.5  # Fallback match: centre distance in box diagonals
+TRACKER_MAX_GAP_SECONDS = 3.0  # Tracks not seen for this long are closed
+
+# Near-duplicate frame gating
+FRAME_GATE_ENABLED = os.getenv("FRAME_GATE_ENABLED", "true").lower() == "true"
+FRAME_GATE_THRESHOLD = 4.0  # Per-cell mean absolute difference (0-255) below which a frame is a duplicate
+FRAME_GATE_SIZE = 128  # Side of the grayscale thumbnail compared between frames
+FRAME_GATE_GRID = 16  # Thumbnail is split into GRID x GRID cells for the comparison
+FRAME_GATE_MAX_SKIP = 10  # Force inference after this many consecutive skipped frames
 SUPPORTED_VIDEO_FORMATS = [".mp4", ".avi", ".mov", ".mkv"]
 SUPPORTED_IMAGE_FORMATS = [".jpg", ".jpeg", ".png", ".bmp"]
 
 # Supabase Storage
 SUPABASE_IMAGES_BUCKET = "images"
 SUPABASE_VIDEOS_BUCKET = "videos"
+UPLOAD_CONCURRENCY = int(os.getenv("UPLOAD_CONCURRENCY", "8"))  # Storage uploads in flight at once
+UPLOAD_MAX_RETRIES = int(os.getenv("UPLOAD_MAX_RETRIES", "3"))  # Retries of a failed upload
+UPLOAD_RETRY_BASE_DELAY = float(os.getenv("UPLOAD_RETRY_BASE_DELAY", "0.5"))  # Seconds, doubled on every retry
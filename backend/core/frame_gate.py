@@ -0,0 +1,99 @@
+import cv2
+import numpy as np
+import logging
+from typing import Callable, Dict, List
+
+from backend.core.config import (
+    FRAME_GATE_ENABLED, FRAME_GATE_THRESHOLD, FRAME_GATE_SIZE, FRAME_GATE_GRID, FRAME_GATE_MAX_SKIP
+)
+
+logger = logging.getLogger(__name__)
+
+class FrameSimilarityGate:
+    """
+    Skip inference on frames that are near-duplicates of the last inferred frame
+    Frames are compared as small grayscale thumbnails: the mean absolute difference (0-255
+    scale) is taken per grid cell and the largest cell decides, so a logo appearing in one
+    corner is not averaged away by an otherwise static shot. Skipped frames reuse the
+    detections of the last inferred frame.
+    """
+
+    def __init__(self, enabled: bool = FRAME_GATE_ENABLED, threshold: float = FRAME_GATE_THRESHOLD,
+                 size: int = FRAME_GATE_SIZE, grid: int = FRAME_GATE_GRID, max_skip: int = FRAME_GATE_MAX_SKIP):
+        self.enabled = enabled
+        self.threshold = threshold
+        self.grid = grid
+        self.size = size - size % grid
+        self.max_skip = max_skip
+        self.reference = None
+        self.reference_detections = []
+        self.skipped_in_row = 0
+        self.frames_total = 0
+        self.frames_skipped = 0
+
+    def _signature(self, frame: np.ndarray) -> np.ndarray:
+        """Downscaled grayscale thumbnail used for the similarity check"""
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        return cv2.resize(gray, (self.size, self.size), interpolation=cv2.INTER_AREA).astype(np.int16)
+
+    def _is_duplicate(self, signature: np.ndarray) -> bool:
+        if self.reference is None or self.skipped_in_row >= self.max_skip:
+            return False
+        cell = self.size // self.grid
+        diff = np.abs(signature - self.reference).reshape(self.grid, cell, self.grid, cell)
+        return float(diff.mean(axis=(1, 3)).max()) < self.threshold
+
+    def detect_batch(self, frames: List[np.ndarray], detect: Callable[[List[np.ndarray]], List[List[Dict]]]) -> List[List[Dict]]:
+        """
+        Run detect only on frames that differ from the last inferred frame
+        Returns one list of detections per frame; reused detections are marked 'propagated'
+        """
+        self.frames_total += len(frames)
+        if not self.enabled:
+            return detect(frames)
+
+        # For each frame, the position in to_infer whose detections it gets (-1: previous batch reference)
+        sources = []
+        to_infer = []
+        for frame in frames:
+            signature = self._signature(frame)
+            if self._is_duplicate(signature):
+                sources.append((len(to_infer) - 1, True))
+                self.skipped_in_row += 1
+                self.frames_skipped += 1
+            else:
+                to_infer.append(frame)
+                sources.append((len(to_infer) - 1, False))
+                self.reference = signature
+                self.skipped_in_row = 0
+
+        inferred = detect(to_infer) if to_infer else []
+
+        batch_detections = []
+        for source, propagated in sources:
+            detections = inferred[source] if source >= 0 else self.reference_detections
+            if propagated:
+                detections = [
+                    {**detection, 'bbox': list(detection['bbox']), 'propagated': True}
+                    for detection in detections
+                ]
+            batch_detections.append(detections)
+
+        if inferred:
+            self.reference_detections = inferred[-1]
+        return batch_detections
+
+    def add_stats(self, stats: Dict):
+        """Fold in counters from a gate that ran elsewhere (e.g. in a segment worker)"""
+        self.frames_total += stats['frames_total']
+        self.frames_skipped += stats['frames_skipped']
+
+    def stats(self) -> Dict:
+        frames_inferred = self.frames_total - self.frames_skipped
+        return {
+            'enabled': self.enabled,
+            'frames_total': self.frames_total,
+            'frames_inferred': frames_inferred,
+            'frames_skipped': self.frames_skipped,
+            'skip_rate': round(self.frames_skipped / self.frames_total, 3) if self.frames_total else 0.0
+        }
@@ -0,0 +1,154 @@
+import queue
+import asyncio
+import threading
+import time
+import logging
+from concurrent.futures import Future
+from typing import Dict, List
+
+import numpy as np
+
+from backend.models.yolo_processor import yolo_processor
+from backend.models.inference_profiles import InferenceProfile, default_profile
+from backend.core.config import INFERENCE_SCHEDULER_ENABLED, SCHEDULER_MAX_BATCH_SIZE, SCHEDULER_MAX_WAIT_MS
+
+logger = logging.getLogger(__name__)
+
+class InferenceScheduler:
+    """
+    Micro-batching front of the shared YOLOProcessor
+    Frames submitted by concurrent jobs are queued and a single worker thread runs them
+    together: a batch goes out as soon as it holds max_batch_size frames or its oldest frame
+    has waited max_wait_ms. Each caller gets a future per frame. Since only the worker thread
+    touches the model, concurrent requests also no longer share the predictor unsynchronized.
+    Frames of different inference profiles share the queue but run as separate model calls.
+    """
+
+    def __init__(self, processor, enabled: bool = INFERENCE_SCHEDULER_ENABLED,
+                 max_batch_size: int = SCHEDULER_MAX_BATCH_SIZE, max_wait_ms: float = SCHEDULER_MAX_WAIT_MS):
+        self.processor = processor
+        self.enabled = enabled
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self._queue = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+        self.batches = 0
+        self.frames = 0
+        self.full_batches = 0
+        self.wait_seconds_total = 0.0
+
+    def submit(self, frames: List[np.ndarray], profile: InferenceProfile = None) -> List[Future]:
+        """Queue frames for detection; returns one future per frame resolving to its DetectionResult"""
+        self._ensure_worker()
+        profile = profile or default_profile
+        futures = []
+        submitted_at = time.perf_counter()
+        for frame in frames:
+            future = Future()
+            self._queue.put((frame, future, submitted_at, profile))
+            futures.append(future)
+        return futures
+
+    def detect_batch(self, frames: List[np.ndarray], batch_size: int = None,
+                     profile: InferenceProfile = None) -> List:
+        """Blocking drop-in for YOLOProcessor.detect_batch (batch_size is decided by the scheduler)"""
+        if not self.enabled:
+            return self.processor.detect_batch(frames, batch_size or self.max_batch_size, profile)
+        return [future.result() for future in self.submit(frames, profile)]
+
+    async def detect_async(self, image: np.ndarray, profile: InferenceProfile = None):
+        """Detect one image without blocking the event loop"""
+        if not self.enabled:
+            return await asyncio.get_running_loop().run_in_executor(
+                None, self.processor.detect_objects, image, profile
+            )
+        return await asyncio.wrap_future(self.submit([image], profile)[0])
+
+    def _ensure_worker(self):
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="inference-scheduler", daemon=True)
+                self._worker.start()
+
+    def _collect(self, first) -> List:
+        """Gather queued frames behind first until the batch is full or first has waited max_wait"""
+        batch = [first]
+        deadline = first[2] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Shutdown marker; put it back so the loop sees it after this batch
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            # Callers that gave up (cancelled futures) don't cost inference
+            batch = [item for item in self._collect(first) if item[1].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            started = time.perf_counter()
+            groups = {}
+            for item in batch:
+                groups.setdefault(item[3].key, []).append(item)
+            for group in groups.values():
+                self._run_group(group)
+            self.batches += 1
+            self.frames += len(batch)
+            self.full_batches += len(batch) == self.max_batch_size
+            self.wait_seconds_total += sum(started - item[2] for item in batch)
+
+    def _run_group(self, group: List):
+        """
+        One processor call for queued frames sharing a profile
+        If the batch fails it is retried frame by frame, so each error only reaches its own caller
+        """
+        frames = [frame for frame, _, _, _ in group]
+        try:
+            results = self.processor.detect_batch(frames, self.max_batch_size, group[0][3])
+        except Exception as e:
+            if len(group) == 1:
+                logger.error(f"Error in scheduled inference: {e}")
+                group[0][1].set_exception(e)
+                return
+            # Frames of other requests share the batch: retry one by one so only the culprit fails
+            logger.warning(f"Error in scheduled inference batch of {len(group)} frames, retrying per frame: {e}")
+            for item in group:
+                self._run_group([item])
+            return
+
+        for (_, future, _, _), result in zip(group, results):
+            future.set_result(result)
+
+    def shutdown(self):
+        with self._worker_lock:
+            if self._worker is not None and self._worker.is_alive():
+                self._queue.put(None)
+                self._worker.join(timeout=5)
+            self._worker = None
+
+    def stats(self) -> Dict:
+        return {
+            'enabled': self.enabled,
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': round(self.max_wait * 1000, 1),
+            'batches': self.batches,
+            'frames': self.frames,
+            'avg_batch_size': round(self.frames / self.batches, 2) if self.batches else 0.0,
+            'full_batches': self.full_batches,
+            'avg_queue_wait_ms': round(self.wait_seconds_total / self.frames * 1000, 2) if self.frames else 0.0,
+            'queued': self._queue.qsize()
+        }
+
+# Global instance
+inference_scheduler = InferenceScheduler(yolo_processor)
@@ -0,0 +1,168 @@
+import asyncio
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional
+
+from backend.core.config import PIPELINE_QUEUE_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of the stream on a stage queue
+_END = object()
+
+class QueueMonitor:
+    """Bounded asyncio queue that records its depth every time an item is added"""
+
+    def __init__(self, name: str, maxsize: int):
+        self.name = name
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.samples = 0
+        self.depth_total = 0
+        self.max_depth = 0
+        self.full_count = 0
+
+    async def put(self, item: Any):
+        depth = self.queue.qsize()
+        self.samples += 1
+        self.depth_total += depth
+        self.max_depth = max(self.max_depth, depth)
+        if self.queue.full():
+            self.full_count += 1
+        await self.queue.put(item)
+
+    async def get(self) -> Any:
+        return await self.queue.get()
+
+    def summary(self) -> Dict:
+        return {
+            'capacity': self.queue.maxsize,
+            'avg_depth': round(self.depth_total / self.samples, 2) if self.samples else 0.0,
+            'max_depth': self.max_depth,
+            'full_count': self.full_count
+        }
+
+class StageStats:
+    """Time a pipeline stage spends working vs. waiting on its neighbours"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.busy_seconds = 0.0
+        self.wait_seconds = 0.0
+
+    def summary(self) -> Dict:
+        return {
+            'items': self.items,
+            'busy_seconds': round(self.busy_seconds, 3),
+            'wait_seconds': round(self.wait_seconds, 3)
+        }
+
+class FramePipeline:
+    """
+    Decode -> infer -> persist pipeline connected by bounded queues
+    Decode and inference run on their own threads so they keep going while the
+    persist stage waits on storage/database round trips; full queues apply
+    backpressure to the stages upstream.
+    """
+
+    def __init__(self, queue_size: int = PIPELINE_QUEUE_SIZE):
+        self.queue_size = max(1, queue_size)
+
+    async def run(self, batches: Iterator, infer: Optional[Callable[[List], List]],
+                  persist: Callable[[List, List], Awaitable[None]]) -> Dict:
+        """
+        Run batches through infer and persist
+        If infer is None, batches already yields (batch, results) pairs and the infer stage passes them through
+        Returns per-stage and per-queue metrics
+        """
+        decoded = QueueMonitor('decoded', self.queue_size)
+        inferred = QueueMonitor('inferred', self.queue_size)
+        stages = {name: StageStats(name) for name in ('decode', 'infer', 'persist')}
+
+        decode_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pipeline-decode")
+        infer_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pipeline-infer")
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+
+        async def decode_stage():
+            stats = stages['decode']
+            while True:
+                t0 = time.perf_counter()
+                batch = await loop.run_in_executor(decode_executor, next, batches, _END)
+                t1 = time.perf_counter()
+                stats.busy_seconds += t1 - t0
+
+                await decoded.put(batch)
+                stats.wait_seconds += time.perf_counter() - t1
+                if batch is _END:
+                    return
+                stats.items += len(batch if infer is not None else batch[0])
+
+        async def infer_stage():
+            stats = stages['infer']
+            while True:
+                t0 = time.perf_counter()
+                batch = await decoded.get()
+                t1 = time.perf_counter()
+                stats.wait_seconds += t1 - t0
+                if batch is _END:
+                    await inferred.put(_END)
+                    return
+
+                if infer is not None:
+                    batch = (batch, await loop.run_in_executor(infer_executor, infer, batch))
+                t2 = time.perf_counter()
+                stats.busy_seconds += t2 - t1
+                stats.items += len(batch[0])
+
+                await inferred.put(batch)
+                stats.wait_seconds += time.perf_counter() - t2
+
+        async def persist_stage():
+            stats = stages['persist']
+            while True:
+                t0 = time.perf_counter()
+                item = await inferred.get()
+                t1 = time.perf_counter()
+                stats.wait_seconds += t1 - t0
+                if item is _END:
+                    return
+
+                batch, results = item
+                await persist(batch, results)
+                stats.busy_seconds += time.perf_counter() - t1
+                stats.items += len(batch)
+
+        tasks = [
+            asyncio.create_task(decode_stage()),
+            asyncio.create_task(infer_stage()),
+            asyncio.create_task(persist_stage())
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        except Exception:
+            for task in tasks:
+                task.cancel()
+            raise
+        finally:
+            # A cancelled stage leaves its executor call running; wait for it (without blocking the loop)
+            # so the caller can't release a capture that is still being read
+            await loop.run_in_executor(None, self._shutdown, batches, decode_executor, infer_executor)
+
+        metrics = {
+            'elapsed_seconds': round(time.perf_counter() - started, 3),
+            'stages': {name: stats.summary() for name, stats in stages.items()},
+            'queues': {queue.name: queue.summary() for queue in (decoded, inferred)}
+        }
+        logger.info(f"Pipeline metrics: {metrics}")
+        return metrics
+
+    @staticmethod
+    def _shutdown(batches: Iterator, *executors: ThreadPoolExecutor):
+        """Wait for in-flight stage calls, then close the source so its own cleanup runs"""
+        for executor in executors:
+            executor.shutdown(wait=True)
+        close = getattr(batches, 'close', None)
+        if close is not None:
+            close()
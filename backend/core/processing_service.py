@@ -1,18 +1,28 @@
 import os
-import shutil
+import asyncio
 import uuid
 from pathlib import Path
 import cv2
 import logging
 from typing import Dict
 
-from backend.database.supabase_client import supabase_client
+from backend.database.supabase_client import supabase_client, RowBuffer
 from backend.models.yolo_processor import yolo_processor
-from backend.core.video_processor import video_processor
+from backend.core.inference_scheduler import inference_scheduler
+from backend.core.upload_manager import upload_manager
+from backend.models.cascade import CascadeStats
+from backend.models.inference_profiles import InferenceProfile, default_profile
+from backend.core.video_processor import video_processor, FrameHandle, FullFrameLoader
 from backend.core.stats_calculator import stats_calculator
+from backend.core.pipeline import FramePipeline
+from backend.core.segment_processor import segment_processor
+from backend.core.frame_gate import FrameSimilarityGate
+from backend.core.adaptive_sampler import AdaptiveSampler
+from backend.core.tracker import DetectionTracker
 from backend.core.config import (
-    FRAMES_DIR, CROPS_DIR, SUPPORTED_VIDEO_FORMATS, SUPPORTED_IMAGE_FORMATS,
-    TARGET_FPS, SUPABASE_IMAGES_BUCKET, SUPABASE_VIDEOS_BUCKET
+    SUPPORTED_VIDEO_FORMATS, SUPPORTED_IMAGE_FORMATS,
+    TARGET_FPS, SAMPLING_MODE, INFERENCE_BATCH_SIZE, PIPELINE_QUEUE_SIZE, DECODE_DOWNSCALE,
+    TRACKING_ENABLED, PERSIST_FRAME_DETECTIONS, SUPABASE_IMAGES_BUCKET, SUPABASE_VIDEOS_BUCKET
 )
 
 logger = logging.getLogger(__name__)
@@ -21,18 +31,42 @@ class ProcessingService:
     def __init__(self):
         pass
     
-    async def process_video(self, video_path: str, original_filename: str, session_id: str) -> Dict:
+    async def _offload(self, func, *args):
+        """Run blocking CPU work (decoding, JPEG encoding) in a thread so the event loop stays responsive"""
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+    
+    async def _check_profile(self, profile: InferenceProfile):
+        """Fail the job before any upload or row on brands the model does not detect"""
+        if profile.brands:
+            model = await self._offload(yolo_processor.manager.get_model)
+            if model is not None:
+                profile.class_ids(model.names)
+    
+    async def process_video(self, video_path: str, original_filename: str, session_id: str,
+                            profile: InferenceProfile = None) -> Dict:
         """Process video file"""
+        profile = profile or default_profile
+        probe = None
+        # Uploads no DB row references (source video, crops) finish in the background and
+        # detection/frame capture rows are bulk inserted, both are settled at the end of the job
+        uploads = []
+        job = {
+            'uploads': uploads,
+            'detections': RowBuffer(supabase_client.insert_detections),
+            'frame_captures': RowBuffer(supabase_client.insert_frame_captures)
+        }
         try:
-            # Get video information
-            video_info = video_processor.get_video_info(video_path)
+            await self._check_profile(profile)
+            
+            # Open the video once: the probe's capture is reused for frame sampling
+            probe = await self._offload(video_processor.probe, video_path)
+            video_info = probe.info
             logger.info(f"Video info: {video_info}")
             
-            # Upload video to Supabase storage
+            # Upload video to Supabase storage while the frames are processed
             storage_path = f"videos/{session_id}/{original_filename}"
-            public_url = await supabase_client.upload_file_to_storage(
-                video_path, SUPABASE_VIDEOS_BUCKET, storage_path
-            )
+            video_upload = upload_manager.submit(video_path, SUPABASE_VIDEOS_BUCKET, storage_path)
+            uploads.append(video_upload)
             
             # Insert file record
             file_data = {
@@ -41,91 +75,112 @@ class ProcessingService:
                 'filename': original_filename,
                 'file_type': 'video',
                 'duration_seconds': int(video_info['duration_seconds']),
-                'fps': video_info['fps']
+                'fps': video_info['fps'],
+                'inference_profile': profile.to_dict()
             }
             file_id = await supabase_client.insert_file_record(file_data)
             
-            # Extract frames
-            frames_dir = os.path.join(FRAMES_DIR, session_id)
-            frame_paths = video_processor.extract_frames(video_path, frames_dir, TARGET_FPS)
-            
-            # Process each frame
+            # Decode, inference and persistence run as concurrent pipeline stages
             all_detections = []
-            crops_dir = os.path.join(CROPS_DIR, session_id)
+            frames_processed = 0
+            gate = FrameSimilarityGate()
             
-            for frame_idx, frame_path in enumerate(frame_paths):
-                # Read frame
-                frame = cv2.imread(frame_path)
-                if frame is None:
-                    continue
-                
-                # Get frame timestamp
-                t_start, t_end = video_processor.get_frame_timestamp(frame_idx, TARGET_FPS)
-                
-                # Detect objects in frame
-                detections = yolo_processor.detect_objects(frame)
-                
-                # If there are detections in this frame, save the full frame
-                frame_capture_id = None
-                if detections:
-                    # Save full frame with detections
-                    frame_filename = f"frame_{frame_idx:06d}.jpg"
-                    frame_capture_path = video_processor.save_full_frame(frame, frames_dir, frame_filename)
+            # With decode-time downscaling only model-sized copies travel through the pipeline
+            # (segment workers letterbox on their own; the adaptive sampler always reads full frames)
+            frame_loader = None
+            if DECODE_DOWNSCALE and SAMPLING_MODE == "adaptive":
+                logger.warning("DECODE_DOWNSCALE has no effect with SAMPLING_MODE=adaptive, frames are decoded at full resolution")
+            elif DECODE_DOWNSCALE and not segment_processor.enabled:
+                frame_loader = FullFrameLoader(video_path, profile.imgsz)
+            
+            def detect(frames):
+                # Batched together with frames of other in-flight jobs
+                batch_detections = inference_scheduler.detect_batch(frames, INFERENCE_BATCH_SIZE, profile)
+                if frame_loader is not None:
+                    for detections in batch_detections:
+                        frame_loader.rescale_detections(detections)
+                return batch_detections
+            
+            def infer(batch):
+                # Near-duplicate frames reuse the last inferred detections; results come back in frame order
+                frames = [frame.inference_frame if isinstance(frame, FrameHandle) else frame for _, _, frame in batch]
+                return gate.detect_batch(frames, detect)
+            
+            # Sampling depends on detection results in adaptive mode, so decode and inference share a stage
+            sampler = AdaptiveSampler(batch_size=INFERENCE_BATCH_SIZE) if SAMPLING_MODE == "adaptive" else None
+            
+            cascade_stats = CascadeStats(yolo_processor.cascade)
+            tracker = DetectionTracker(yolo_processor.crop_detection) if TRACKING_ENABLED else None
+            persist_frames = PERSIST_FRAME_DETECTIONS or tracker is None
+            # Stretch of video each fixed-rate sample stands for (adaptive samples vary, see sample_interval)
+            fps = video_info['fps']
+            fixed_interval = video_processor.get_frame_interval(fps, TARGET_FPS) / fps if fps > 0 else 1.0 / TARGET_FPS
+            
+            async def persist(batch, batch_detections):
+                nonlocal frames_processed
+                cascade_stats.add(batch_detections)
+                # Adaptive refinement goes back in time: tracks may only close before the settled time
+                horizon = sampler.pop_settled_timestamp(batch) if sampler is not None else None
+                for (frame_idx, timestamp, frame), detections in zip(batch, batch_detections):
+                    frames_processed += 1
+                    interval = sampler.sample_interval(frame_idx) if sampler is not None else fixed_interval
                     
-                    # Upload frame to storage
-                    frame_storage_path = f"frames/{session_id}/{frame_filename}"
-                    frame_url = await supabase_client.upload_file_to_storage(
-                        frame_capture_path, SUPABASE_IMAGES_BUCKET, frame_storage_path
-                    )
+                    # Add to all detections for statistics
+                    for detection in detections:
+                        detection['frame_number'] = frame_idx
+                        all_detections.append(detection)
                     
-                    # Insert frame capture record (using actual frame_captures structure)
-                    frame_capture_data = {
-                        'file_id': file_id,
-                        'frame_number': frame_idx,
-                        'bucket': SUPABASE_IMAGES_BUCKET,
-                        'path': frame_storage_path,
-                        'public_url': frame_url,
-                        't_start': t_start,
-                        't_end': t_end,
-                        'detections_count': len(detections)
-                    }
-                    frame_capture_id = await supabase_client.insert_frame_capture(frame_capture_data)
-                
-                for detection in detections:
-                    # Crop detection area
-                    crop = yolo_processor.crop_detection(frame, detection['bbox'])
+                    # Full-resolution frames are only needed (and JPEG-encoded) when they contain detections
+                    if detections and isinstance(frame, FrameHandle):
+                        frame = await self._offload(frame.load)
                     
-                    # Save crop
-                    crop_filename = f"frame_{frame_idx:06d}_detection_{len(all_detections):04d}.jpg"
-                    crop_path = video_processor.save_frame_crop(crop, crops_dir, crop_filename)
+                    if detections and persist_frames:
+                        await self._persist_video_frame(
+                            file_id, session_id, frame_idx, timestamp, interval, frame, detections,
+                            job
+                        )
                     
-                    # Upload crop to storage
-                    crop_storage_path = f"crops/{session_id}/{crop_filename}"
-                    crop_url = await supabase_client.upload_file_to_storage(
-                        crop_path, SUPABASE_IMAGES_BUCKET, crop_storage_path
+                    if tracker is not None:
+                        tracker.update(frame_idx, timestamp, frame, detections, interval)
+                
+                if tracker is not None:
+                    # Only once every frame of the batch is matched, so no track closes under a later frame
+                    for track in tracker.close_before(horizon):
+                        await self._persist_track(file_id, session_id, track, tracker, job)
+            
+            if sampler is not None:
+                pipeline_metrics = await FramePipeline(PIPELINE_QUEUE_SIZE).run(
+                    sampler.iter_results(video_path, lambda frames: gate.detect_batch(frames, detect), probe),
+                    None, persist
+                )
+            elif segment_processor.enabled:
+                # Worker processes decode and infer segments; results are merged in frame order
+                pipeline_metrics = await FramePipeline(PIPELINE_QUEUE_SIZE).run(
+                    segment_processor.iter_results(
+                        video_path, video_info, TARGET_FPS, INFERENCE_BATCH_SIZE, gate, profile
+                    ),
+                    None, persist
+                )
+            else:
+                try:
+                    pipeline_metrics = await FramePipeline(PIPELINE_QUEUE_SIZE).run(
+                        video_processor.iter_frame_batches(
+                            video_path, TARGET_FPS, INFERENCE_BATCH_SIZE, frame_loader=frame_loader, probe=probe
+                        ),
+                        infer, persist
                     )
-                    
-                    # Get or create brand
-                    brand_id = await supabase_client.get_or_create_brand(detection['class_name'])
-                    
-                    # Prepare detection data (removing frame_capture_id as it's not in the schema)
-                    detection_data = {
-                        'file_id': file_id,
-                        'brand_id': brand_id,
-                        'score': detection['confidence'],
-                        'bbox': detection['bbox'],
-                        't_start': t_start,
-                        't_end': t_end,
-                        'frame': frame_idx,
-                        'model': 'yolov8'
-                    }
-                    
-                    # Insert detection
-                    detection_id = await supabase_client.insert_detection(detection_data)
-                    
-                    # Add to all detections for statistics
-                    detection['frame_number'] = frame_idx
-                    all_detections.append(detection)
+                finally:
+                    if frame_loader is not None:
+                        frame_loader.release()
+            
+            if tracker is not None:
+                for track in tracker.finish():
+                    await self._persist_track(file_id, session_id, track, tracker, job)
+            
+            probe.release()
+            logger.info(f"Processed {frames_processed} sampled frames, {len(all_detections)} detections")
+            if cascade_stats.enabled:
+                logger.info(f"Cascade screening: {cascade_stats.stats()}")
             
             # Calculate statistics
             brand_stats = stats_calculator.calculate_brand_statistics(
@@ -133,74 +188,214 @@ class ProcessingService:
             )
             
             # Insert predictions
-            prediction_ids = []
+            predictions = []
             for brand_name, stats in brand_stats.items():
                 brand_id = await supabase_client.get_or_create_brand(brand_name)
-                prediction_data = stats_calculator.prepare_prediction_data(
+                predictions.append(stats_calculator.prepare_prediction_data(
                     stats, brand_id, file_id, video_info['duration_seconds']
-                )
-                prediction_id = await supabase_client.insert_prediction(prediction_data)
-                prediction_ids.append(prediction_id)
+                ))
+            prediction_ids = await supabase_client.insert_predictions(predictions)
+            
+            # Rows still buffered from the last frames
+            await job['frame_captures'].flush()
+            await job['detections'].flush()
+            
+            # Crop and video uploads must be done before the uploaded video goes away
+            await upload_manager.wait(uploads)
+            public_url = video_upload.result()
             
             # Cleanup temporary files
-            shutil.rmtree(frames_dir, ignore_errors=True)
-            shutil.rmtree(crops_dir, ignore_errors=True)
             os.remove(video_path)
             
             return {
                 'file_id': file_id,
                 'session_id': session_id,
+                'frames_processed': frames_processed,
                 'detections_count': len(all_detections),
+                'tracks_count': tracker.tracks_count if tracker else None,
                 'brands_detected': list(brand_stats.keys()),
                 'statistics': brand_stats,
+                'frame_gate': gate.stats(),
+                'cascade': cascade_stats.stats(),
+                'inference_profile': profile.to_dict(),
+                'adaptive_sampling': sampler.stats() if sampler else None,
+                'pipeline': pipeline_metrics,
                 'video_url': public_url
             }
             
         except Exception as e:
             logger.error(f"Error processing video: {e}")
+            for upload in uploads:
+                upload.cancel()
             raise
+        finally:
+            if probe is not None:
+                probe.release()
 
-    async def process_image(self, image_path: str, original_filename: str, session_id: str) -> Dict:
+    async def _persist_video_frame(self, file_id: int, session_id: str, frame_idx: int, timestamp: float,
+                                   interval: float, frame, detections: list, job: Dict):
+        """
+        Upload the frame capture and crops of a video frame and insert its detection records
+        The frame capture row needs the frame URL; crop uploads go to job['uploads'] instead of being awaited
+        and the rows to the job's bulk insert buffers
+        """
+        # Each sampled frame covers the sampling interval it was taken at
+        t_start = timestamp
+        t_end = timestamp + interval
+        
+        # Encode full frame with detections
+        frame_filename = f"frame_{frame_idx:06d}.jpg"
+        frame_jpeg = await self._offload(video_processor.encode_jpeg, frame)
+        
+        # Upload frame to storage, concurrently with the crops
+        frame_storage_path = f"frames/{session_id}/{frame_filename}"
+        frame_upload = upload_manager.submit(frame_jpeg, SUPABASE_IMAGES_BUCKET, frame_storage_path)
+        
+        for idx, detection in enumerate(detections):
+            # Crop detection area
+            crop = yolo_processor.crop_detection(frame, detection['bbox'])
+            
+            # Encode crop
+            crop_filename = f"frame_{frame_idx:06d}_detection_{idx:04d}.jpg"
+            crop_jpeg = await self._offload(video_processor.encode_jpeg, crop)
+            
+            # Upload crop to storage
+            crop_storage_path = f"crops/{session_id}/{crop_filename}"
+            job['uploads'].append(upload_manager.submit(crop_jpeg, SUPABASE_IMAGES_BUCKET, crop_storage_path))
+        
+        frame_url = await frame_upload
+        
+        # Insert frame capture record (using actual frame_captures structure)
+        frame_capture_data = {
+            'file_id': file_id,
+            'frame_number': frame_idx,
+            'bucket': SUPABASE_IMAGES_BUCKET,
+            'path': frame_storage_path,
+            'public_url': frame_url,
+            't_start': t_start,
+            't_end': t_end,
+            'detections_count': len(detections)
+        }
+        await job['frame_captures'].add(frame_capture_data)
+        
+        for detection in detections:
+            # Get or create brand
+            brand_id = await supabase_client.get_or_create_brand(detection['class_name'])
+            
+            # Prepare detection data (removing frame_capture_id as it's not in the schema)
+            detection_data = {
+                'file_id': file_id,
+                'brand_id': brand_id,
+                'score': detection['confidence'],
+                'bbox': detection['bbox'],
+                't_start': t_start,
+                't_end': t_end,
+                'frame': frame_idx,
+                'model': 'yolov8'
+            }
+            
+            # Insert detection
+            await job['detections'].add(detection_data)
+    
+    async def _persist_track(self, file_id: int, session_id: str, track: dict, tracker: DetectionTracker,
+                             job: Dict):
+        """Upload the best crop and frame of a finished track and insert one detection record for it"""
+        best = track['best']
+        t_start = track['t_first']
+        t_end = track['t_end']
+        summary = tracker.summary(track)
+        
+        # Encode and upload the best frame of the track
+        frame_filename = f"track_{track['track_id']:04d}_frame_{best['frame_number']:06d}.jpg"
+        frame_jpeg = await self._offload(video_processor.encode_jpeg, track['best_frame'])
+        frame_storage_path = f"frames/{session_id}/{frame_filename}"
+        frame_upload = upload_manager.submit(frame_jpeg, SUPABASE_IMAGES_BUCKET, frame_storage_path)
+        
+        # Encode and upload the best crop of the track (no row references its URL)
+        crop_filename = f"track_{track['track_id']:04d}.jpg"
+        crop_jpeg = await self._offload(video_processor.encode_jpeg, track['best_crop'])
+        crop_storage_path = f"crops/{session_id}/{crop_filename}"
+        job['uploads'].append(upload_manager.submit(crop_jpeg, SUPABASE_IMAGES_BUCKET, crop_storage_path))
+        
+        frame_url = await frame_upload
+        frame_capture_data = {
+            'file_id': file_id,
+            'frame_number': best['frame_number'],
+            'bucket': SUPABASE_IMAGES_BUCKET,
+            'path': frame_storage_path,
+            'public_url': frame_url,
+            't_start': t_start,
+            't_end': t_end,
+            'detections_count': summary['detections_count']
+        }
+        await job['frame_captures'].add(frame_capture_data)
+        
+        brand_id = await supabase_client.get_or_create_brand(track['class_name'])
+        
+        # One detection record spanning the whole track
+        detection_data = {
+            'file_id': file_id,
+            'brand_id': brand_id,
+            'score': best['confidence'],
+            'bbox': best['bbox'],
+            't_start': t_start,
+            't_end': t_end,
+            'frame': best['frame_number'],
+            'model': 'yolov8',
+            'track_id': track['track_id'],
+            'first_frame': track['first_frame'],
+            'last_frame': track['last_frame'],
+            'frames_count': summary['detections_count'],
+            'avg_score': summary['avg_score'],
+            'min_score': summary['min_score']
+        }
+        await job['detections'].add(detection_data)
+
+    async def process_image(self, image_path: str, original_filename: str, session_id: str,
+                            profile: InferenceProfile = None) -> Dict:
         """Process image file"""
+        profile = profile or default_profile
+        # Uploads no DB row references (source image, crops) finish in the background
+        uploads = []
         try:
-            # Upload image to Supabase storage
+            await self._check_profile(profile)
+            
+            # Read the image first: an unreadable file fails before anything is uploaded or stored
+            image = await self._offload(cv2.imread, image_path)
+            if image is None:
+                raise Exception(f"Could not read image: {original_filename}")
+            
+            # Upload image to Supabase storage while it is processed
             storage_path = f"images/{session_id}/{original_filename}"
-            public_url = await supabase_client.upload_file_to_storage(
-                image_path, SUPABASE_IMAGES_BUCKET, storage_path
-            )
+            image_upload = upload_manager.submit(image_path, SUPABASE_IMAGES_BUCKET, storage_path)
+            uploads.append(image_upload)
             
             # Insert file record
             file_data = {
                 'bucket': SUPABASE_IMAGES_BUCKET,
                 'path': storage_path,
                 'filename': original_filename,
-                'file_type': 'image'
+                'file_type': 'image',
+                'inference_profile': profile.to_dict()
             }
             file_id = await supabase_client.insert_file_record(file_data)
             
-            # Read and process image
-            image = cv2.imread(image_path)
-            detections = yolo_processor.detect_objects(image)
+            # Process image
+            detections = await inference_scheduler.detect_async(image, profile)
             
             # Process detections
-            crops_dir = os.path.join(CROPS_DIR, session_id)
-            detection_ids = []
+            detection_rows = []
             
             # If there are detections, save the full image as frame capture
             frame_capture_id = None
             if detections:
-                # Create frames directory for this session
-                frames_dir = os.path.join(FRAMES_DIR, session_id)
-                
-                # Save full image with detections
+                # Encode full image with detections
                 frame_filename = f"image_frame.jpg"
-                frame_capture_path = video_processor.save_full_frame(image, frames_dir, frame_filename)
+                frame_jpeg = await self._offload(video_processor.encode_jpeg, image)
                 
-                # Upload frame to storage
+                # Upload frame to storage (the frame capture row needs its URL)
                 frame_storage_path = f"frames/{session_id}/{frame_filename}"
-                frame_url = await supabase_client.upload_file_to_storage(
-                    frame_capture_path, SUPABASE_IMAGES_BUCKET, frame_storage_path
-                )
+                frame_url = await upload_manager.upload(frame_jpeg, SUPABASE_IMAGES_BUCKET, frame_storage_path)
                 
                 # Insert frame capture record (for images)
                 frame_capture_data = {
@@ -211,23 +406,18 @@ class ProcessingService:
                     'detections_count': len(detections)
                 }
                 frame_capture_id = await supabase_client.insert_frame_capture(frame_capture_data)
-                
-                # Cleanup frames directory after upload
-                shutil.rmtree(frames_dir, ignore_errors=True)
             
             for idx, detection in enumerate(detections):
                 # Crop detection area
                 crop = yolo_processor.crop_detection(image, detection['bbox'])
                 
-                # Save crop
+                # Encode crop
                 crop_filename = f"image_detection_{idx:04d}.jpg"
-                crop_path = video_processor.save_frame_crop(crop, crops_dir, crop_filename)
+                crop_jpeg = await self._offload(video_processor.encode_jpeg, crop)
                 
-                # Upload crop to storage
+                # Upload crop to storage in the background
                 crop_storage_path = f"crops/{session_id}/{crop_filename}"
-                crop_url = await supabase_client.upload_file_to_storage(
-                    crop_path, SUPABASE_IMAGES_BUCKET, crop_storage_path
-                )
+                uploads.append(upload_manager.submit(crop_jpeg, SUPABASE_IMAGES_BUCKET, crop_storage_path))
                 
                 # Get or create brand
                 brand_id = await supabase_client.get_or_create_brand(detection['class_name'])
@@ -242,12 +432,16 @@ class ProcessingService:
                     'model': 'yolov8'
                 }
                 
-                # Insert detection
-                detection_id = await supabase_client.insert_detection(detection_data)
-                detection_ids.append(detection_id)
+                detection_rows.append(detection_data)
+            
+            # Insert detections with one request
+            detection_ids = await supabase_client.insert_detections(detection_rows)
+            
+            # Crop and image uploads must be done before the uploaded image goes away
+            await upload_manager.wait(uploads)
+            public_url = image_upload.result()
             
             # Cleanup
-            shutil.rmtree(crops_dir, ignore_errors=True)
             os.remove(image_path)
             
             return {
@@ -255,12 +449,15 @@ class ProcessingService:
                 'session_id': session_id,
                 'detections_count': len(detections),
                 'brands_detected': [d['class_name'] for d in detections],
-                'detections': detections,
+                'detections': list(detections),
+                'inference_profile': profile.to_dict(),
                 'image_url': public_url
             }
             
         except Exception as e:
             logger.error(f"Error processing image: {e}")
+            for upload in uploads:
+                upload.cancel()
             raise
 
 # Global instance
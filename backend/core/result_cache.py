@@ -0,0 +1,117 @@
+import os
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from backend.core.config import RESULT_CACHE_ENABLED, RESULT_CACHE_SIZE, RESULT_CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+# (boxes, scores, class_ids) as stored in a DetectionResult
+CachedArrays = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+class ResultCache:
+    """
+    Content-addressed detection results: LRU in memory plus an optional on-disk tier
+    Keys combine a hash of the image pixels with a context string describing everything
+    else that changes the output (model version, confidence threshold, tiling, ...).
+    """
+
+    def __init__(self, enabled: bool = RESULT_CACHE_ENABLED, max_entries: int = RESULT_CACHE_SIZE,
+                 cache_dir: str = RESULT_CACHE_DIR):
+        self.enabled = enabled
+        self.max_entries = max(1, max_entries)
+        self.cache_dir = cache_dir
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, image: np.ndarray, context: str) -> str:
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(f"{context}|{image.shape}|{image.dtype}".encode())
+        digest.update(np.ascontiguousarray(image).data)
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[CachedArrays]:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return self._entries[key]
+
+        arrays = self._read_disk(key)
+        with self._lock:
+            if arrays is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+        self._remember(key, arrays)
+        return arrays
+
+    def put(self, key: str, arrays: CachedArrays):
+        self._remember(key, arrays)
+        self._write_disk(key, arrays)
+
+    def _remember(self, key: str, arrays: CachedArrays):
+        with self._lock:
+            self._entries[key] = arrays
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.npz")
+
+    def _read_disk(self, key: str) -> Optional[CachedArrays]:
+        if not self.cache_dir:
+            return None
+        try:
+            with np.load(self._disk_path(key)) as data:
+                return data['boxes'], data['scores'], data['class_ids']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _write_disk(self, key: str, arrays: CachedArrays):
+        if not self.cache_dir:
+            return
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write then rename so concurrent readers never see a partial file
+            temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, 'wb') as f:
+                np.savez(f, boxes=arrays[0], scores=arrays[1], class_ids=arrays[2])
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write result cache entry: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'disk_tier': bool(self.cache_dir),
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(hits / lookups, 3) if lookups else 0.0
+            }
+
+# Global instance
+result_cache = ResultCache()
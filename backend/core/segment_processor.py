@@ -0,0 +1,190 @@
+import math
+import logging
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterator, List, Tuple
+
+from backend.core.video_processor import video_processor, letterbox, rescale_detections
+from backend.models.inference_profiles import InferenceProfile, default_profile
+from backend.core.frame_gate import FrameSimilarityGate
+from backend.core.threading_config import apply_thread_settings, available_cpus, split_cpus
+from backend.core.config import (
+    VIDEO_WORKERS, VIDEO_SEGMENT_SECONDS, SEGMENT_BUFFER_MB, INFERENCE_BATCH_SIZE, DECODE_DOWNSCALE,
+    INFERENCE_THREADS, PIN_WORKERS
+)
+
+logger = logging.getLogger(__name__)
+
+# Per-process detector, created by the pool initializer
+_worker_yolo_processor = None
+
+def _init_worker(cpu_slices: List[List[int]], worker_counter):
+    """
+    Give each worker process its own YOLOProcessor, loaded and warmed up before the first segment
+    Workers split the cores between them: pinned to their own slice with PIN_WORKERS, and
+    by default with as many inference threads as their share so they don't oversubscribe
+    """
+    global _worker_yolo_processor
+    with worker_counter.get_lock():
+        worker_index = worker_counter.value % len(cpu_slices)
+        worker_counter.value += 1
+    cpus = cpu_slices[worker_index]
+    apply_thread_settings(
+        inference_threads=INFERENCE_THREADS or max(1, len(cpus)),
+        cpus=cpus if PIN_WORKERS else None
+    )
+    
+    from backend.models.yolo_processor import yolo_processor
+    yolo_processor.manager.load()
+    _worker_yolo_processor = yolo_processor
+
+def _process_segment(video_path: str, target_fps: float, start_frame: int, end_frame: int,
+                     batch_size: int, profile: InferenceProfile) -> Tuple[List[Tuple], Dict]:
+    """
+    Decode and run detection on one segment of a video
+    Returns (frame_index, timestamp, frame, detections) in frame order, where the frame is
+    only sent back to the parent process when it has detections, plus the frame gate stats
+    """
+    # The gate starts empty, so the first frame of every segment is always inferred: unlike a
+    # serial run, a near-duplicate frame at a segment boundary gets fresh detections
+    gate = FrameSimilarityGate()
+    results = []
+    for batch in video_processor.iter_frame_batches(video_path, target_fps, batch_size, start_frame, end_frame):
+        if DECODE_DOWNSCALE:
+            # The full frames are already decoded here, only inference gets the model-sized copy
+            letterboxed = [letterbox(frame, profile.imgsz) for _, _, frame in batch]
+            params, original_shape = letterboxed[0][1], batch[0][2].shape
+            batch_detections = gate.detect_batch(
+                [image for image, _ in letterboxed],
+                lambda frames: [
+                    rescale_detections(detections, params, original_shape)
+                    for detections in _worker_yolo_processor.detect_batch(frames, batch_size, profile)
+                ]
+            )
+        else:
+            batch_detections = gate.detect_batch(
+                [frame for _, _, frame in batch],
+                lambda frames: _worker_yolo_processor.detect_batch(frames, batch_size, profile)
+            )
+        for (frame_idx, timestamp, frame), detections in zip(batch, batch_detections):
+            results.append((frame_idx, timestamp, frame if detections else None, detections))
+    return results, gate.stats()
+
+class SegmentProcessor:
+    """
+    Split a video into frame-range segments and run them on a process pool
+    Each segment has its own frame gate, so results can differ slightly from a serial run
+    at segment boundaries (see _process_segment)
+    A segment's results come back in one piece, with a full-resolution frame for every sample
+    that has detections; segments are sized and kept in flight so that, even if every sample
+    has detections, they hold at most SEGMENT_BUFFER_MB of frames
+    """
+
+    def __init__(self, workers: int = VIDEO_WORKERS, buffer_mb: int = SEGMENT_BUFFER_MB):
+        self.workers = max(1, workers)
+        self.buffer_mb = buffer_mb
+        self._pool = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.workers > 1
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn keeps torch/OpenCV thread state out of the workers
+            context = multiprocessing.get_context("spawn")
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(split_cpus(available_cpus(), self.workers), context.Value('i', 0))
+            )
+        return self._pool
+
+    def plan_segments(self, video_info: Dict, target_fps: float) -> List[Tuple[int, int]]:
+        """
+        Split the video into (start_frame, end_frame) ranges aligned to the sampling grid
+        The last range is open-ended so an underreported frame count loses no frames
+        """
+        frame_interval = video_processor.get_frame_interval(video_info['fps'], target_fps)
+        total_samples = max(1, math.ceil(video_info['frame_count'] / frame_interval))
+
+        segment_samples = max(1, int(VIDEO_SEGMENT_SECONDS * target_fps)) if target_fps > 0 else total_samples
+        # Every worker busy at once must stay within the frame buffer budget
+        segment_samples = min(segment_samples, max(1, self.max_buffered_frames(video_info) // self.workers))
+        segment_count = max(self.workers, math.ceil(total_samples / segment_samples))
+        segment_samples = max(1, math.ceil(total_samples / segment_count))
+
+        segments = []
+        start_sample = 0
+        while start_sample < total_samples:
+            end_sample = start_sample + segment_samples
+            segments.append((start_sample * frame_interval, end_sample * frame_interval))
+            start_sample = end_sample
+        segments[-1] = (segments[-1][0], None)
+        return segments
+
+    def max_buffered_frames(self, video_info: Dict) -> int:
+        """Full-resolution BGR frames that fit in the buffer budget (at least one per worker)"""
+        frame_bytes = max(1, video_info.get('width', 0) * video_info.get('height', 0) * 3)
+        return max(self.workers, self.buffer_mb * 1024 * 1024 // frame_bytes)
+
+    def iter_results(self, video_path: str, video_info: Dict, target_fps: float,
+                     batch_size: int = INFERENCE_BATCH_SIZE,
+                     gate: FrameSimilarityGate = None,
+                     profile: InferenceProfile = None) -> Iterator[Tuple[List, List]]:
+        """
+        Yield (batch, batch_detections) in frame order, batch_size samples at a time
+        batch holds (frame_index, timestamp, frame) like VideoProcessor.iter_frame_batches
+        Frame gate counters from the workers are added to gate when given
+        """
+        profile = profile or default_profile
+        segments = self.plan_segments(video_info, target_fps)
+        frame_interval = video_processor.get_frame_interval(video_info['fps'], target_fps)
+        segment_samples = math.ceil((segments[0][1] or video_info['frame_count']) / frame_interval)
+        # Up to two segments per worker, so a worker never waits for the parent, unless that breaks the budget
+        max_pending = max(1, min(self.workers * 2, self.max_buffered_frames(video_info) // segment_samples))
+        logger.info(f"Processing {len(segments)} segments on {self.workers} worker processes "
+                    f"({segment_samples} samples each, up to {max_pending} in flight)")
+
+        pool = self._get_pool()
+        pending = deque()
+        next_segment = 0
+        try:
+            while next_segment < len(segments) or pending:
+                # Keep a bounded number of segments in flight so finished results don't pile up
+                while next_segment < len(segments) and len(pending) < max_pending:
+                    start_frame, end_frame = segments[next_segment]
+                    pending.append(pool.submit(
+                        _process_segment, video_path, target_fps, start_frame, end_frame, batch_size, profile
+                    ))
+                    next_segment += 1
+
+                segment_results, gate_stats = pending.popleft().result()
+                if gate is not None:
+                    gate.add_stats(gate_stats)
+                # Hand results on in batches, dropping each once it is passed downstream
+                segment_results.reverse()
+                while segment_results:
+                    chunk = [segment_results.pop() for _ in range(min(batch_size, len(segment_results)))]
+                    yield (
+                        [(frame_idx, timestamp, frame) for frame_idx, timestamp, frame, _ in chunk],
+                        [detections for *_, detections in chunk]
+                    )
+        except BrokenProcessPool:
+            logger.error("Segment worker pool crashed, it will be recreated on the next video")
+            self._pool = None
+            raise
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+# Global instance
+segment_processor = SegmentProcessor()
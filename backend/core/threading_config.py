@@ -0,0 +1,89 @@
+import os
+import logging
+from typing import Dict, List, Optional
+
+import cv2
+
+from backend.core.config import INFERENCE_THREADS, INFERENCE_INTEROP_THREADS, OPENCV_THREADS, CPU_AFFINITY
+
+logger = logging.getLogger(__name__)
+
+def parse_cpu_list(spec: str) -> List[int]:
+    """Parse a CPU list like "0-3,8,10-11" into sorted core ids"""
+    cpus = set()
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            start, end = part.split("-", 1)
+            cpus.update(range(int(start), int(end) + 1))
+        else:
+            cpus.add(int(part))
+    return sorted(cpus)
+
+def available_cpus() -> List[int]:
+    """Cores this process may run on"""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+def split_cpus(cpus: List[int], parts: int) -> List[List[int]]:
+    """Split cores into parts contiguous, near-equal slices (cores are shared when there are fewer than parts)"""
+    parts = max(1, parts)
+    if len(cpus) < parts:
+        return [[cpus[i % len(cpus)]] for i in range(parts)] if cpus else [[] for _ in range(parts)]
+    size, extra = divmod(len(cpus), parts)
+    slices, start = [], 0
+    for i in range(parts):
+        end = start + size + (1 if i < extra else 0)
+        slices.append(cpus[start:end])
+        start = end
+    return slices
+
+def pin_to_cpus(cpus: List[int]) -> bool:
+    """Restrict the current process to cpus (Linux only)"""
+    if not cpus or not hasattr(os, "sched_setaffinity"):
+        return False
+    try:
+        os.sched_setaffinity(0, cpus)
+        return True
+    except OSError as e:
+        logger.warning(f"Could not pin process to CPUs {cpus}: {e}")
+        return False
+
+def apply_thread_settings(inference_threads: int = INFERENCE_THREADS,
+                          interop_threads: int = INFERENCE_INTEROP_THREADS,
+                          opencv_threads: int = OPENCV_THREADS,
+                          cpus: Optional[List[int]] = None) -> Dict:
+    """
+    Configure torch and OpenCV thread pools, optionally pinning the process first
+    0 (or -1 for OpenCV) leaves a library at its default. Call before the first inference:
+    torch only accepts the inter-op setting once.
+    """
+    if cpus is None and CPU_AFFINITY:
+        cpus = parse_cpu_list(CPU_AFFINITY)
+    pinned = pin_to_cpus(cpus) if cpus else False
+
+    if opencv_threads >= 0:
+        cv2.setNumThreads(opencv_threads)
+
+    try:
+        import torch
+        if inference_threads > 0:
+            torch.set_num_threads(inference_threads)
+        if interop_threads > 0:
+            torch.set_num_interop_threads(interop_threads)
+        torch_threads = torch.get_num_threads()
+    except (ImportError, RuntimeError) as e:
+        logger.warning(f"Could not configure torch threads: {e}")
+        torch_threads = None
+
+    settings = {
+        'cpus': available_cpus(),
+        'pinned': pinned,
+        'torch_threads': torch_threads,
+        'opencv_threads': cv2.getNumThreads()
+    }
+    logger.info(f"Thread settings: {settings}")
+    return settings
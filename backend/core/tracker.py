@@ -0,0 +1,159 @@
+import logging
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from backend.core.config import (
+    TRACKER_IOU_THRESHOLD, TRACKER_MAX_CENTROID_DISTANCE, TRACKER_MAX_GAP_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+def bbox_iou(a: List[float], b: List[float]) -> float:
+    """Intersection over union of two [x1, y1, x2, y2] boxes"""
+    ix1, iy1 = max(a[0], b[0]), max(a[1], b[1])
+    ix2, iy2 = min(a[2], b[2]), min(a[3], b[3])
+    intersection = max(0.0, ix2 - ix1) * max(0.0, iy2 - iy1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - intersection
+    return intersection / union if union > 0 else 0.0
+
+def bbox_centroid_distance(a: List[float], b: List[float]) -> float:
+    """Distance between box centres, relative to the diagonal of box a"""
+    diagonal = float(np.hypot(a[2] - a[0], a[3] - a[1])) or 1.0
+    dx = (a[0] + a[2]) / 2 - (b[0] + b[2]) / 2
+    dy = (a[1] + a[3]) / 2 - (b[1] + b[3]) / 2
+    return float(np.hypot(dx, dy)) / diagonal
+
+class DetectionTracker:
+    """
+    Link detections of the same brand across sampled frames into tracks
+    A detection joins the active track of its class whose last box overlaps it by at least
+    iou_threshold, or failing that whose centre is within max_centroid_distance box
+    diagonals. Tracks not seen for max_gap_seconds before a horizon are finished by close_before.
+    Frames may arrive out of time order (adaptive sampling refines backwards), so closing is
+    separate from update: the caller feeds a whole batch first, then closes against the time
+    before which no more frames will come.
+    """
+
+    def __init__(self, crop: Callable, iou_threshold: float = TRACKER_IOU_THRESHOLD,
+                 max_centroid_distance: float = TRACKER_MAX_CENTROID_DISTANCE,
+                 max_gap_seconds: float = TRACKER_MAX_GAP_SECONDS):
+        self.crop = crop
+        self.iou_threshold = iou_threshold
+        self.max_centroid_distance = max_centroid_distance
+        self.max_gap_seconds = max_gap_seconds
+        self.active = []
+        self.next_track_id = 1
+        self.tracks_count = 0
+        self.latest_timestamp = 0.0
+
+    def update(self, frame_idx: int, timestamp: float, frame: np.ndarray, detections: List[Dict],
+               interval: float = 0.0):
+        """Add the detections of one sampled frame; interval is the stretch of video the frame stands for"""
+        matched = set()
+        for detection in sorted(detections, key=lambda d: d['confidence'], reverse=True):
+            track = self._match(detection, timestamp, matched)
+            if track is None:
+                track = self._start_track(detection)
+                self.active.append(track)
+            matched.add(track['track_id'])
+            self._extend_track(track, frame_idx, timestamp, interval, frame, detection)
+
+        self.latest_timestamp = max(self.latest_timestamp, timestamp)
+
+    def close_before(self, horizon: float = None) -> List[Dict]:
+        """
+        Finish and return the tracks not seen for max_gap_seconds before horizon
+        (default: the latest timestamp seen, for frames fed in time order)
+        """
+        horizon = self.latest_timestamp if horizon is None else horizon
+        finished = [t for t in self.active if horizon - t['t_last'] > self.max_gap_seconds]
+        if finished:
+            self.active = [t for t in self.active if t not in finished]
+        return finished
+
+    def finish(self) -> List[Dict]:
+        """Finish and return every remaining track"""
+        finished, self.active = self.active, []
+        return finished
+
+    def _match(self, detection: Dict, timestamp: float, matched: set):
+        best_track, best_key = None, None
+        for track in self.active:
+            if track['class_name'] != detection['class_name'] or track['track_id'] in matched:
+                continue
+            # Compare with the end of the track the frame is closest to in time
+            if timestamp < track['t_first']:
+                gap, reference = track['t_first'] - timestamp, track['first_bbox']
+            else:
+                gap, reference = max(0.0, timestamp - track['t_last']), track['last_bbox']
+            if gap > self.max_gap_seconds:
+                continue
+            iou = bbox_iou(reference, detection['bbox'])
+            distance = bbox_centroid_distance(reference, detection['bbox'])
+            if iou < self.iou_threshold and distance > self.max_centroid_distance:
+                continue
+            # Prefer overlap, then proximity
+            key = (iou, -distance)
+            if best_key is None or key > best_key:
+                best_track, best_key = track, key
+        return best_track
+
+    def _start_track(self, detection: Dict) -> Dict:
+        track = {
+            'track_id': self.next_track_id,
+            'class_name': detection['class_name'],
+            'class_id': detection.get('class_id'),
+            'first_frame': None,
+            'last_frame': None,
+            't_first': None,
+            't_last': None,
+            't_end': None,
+            'first_bbox': detection['bbox'],
+            'last_bbox': detection['bbox'],
+            'detections_count': 0,
+            'score_sum': 0.0,
+            'max_score': 0.0,
+            'min_score': 1.0,
+            'best': None,
+            'best_crop': None,
+            'best_frame': None
+        }
+        self.next_track_id += 1
+        self.tracks_count += 1
+        return track
+
+    def _extend_track(self, track: Dict, frame_idx: int, timestamp: float, interval: float,
+                      frame: np.ndarray, detection: Dict):
+        score = detection['confidence']
+        if track['t_first'] is None or timestamp < track['t_first']:
+            track['t_first'], track['first_frame'] = timestamp, frame_idx
+            track['first_bbox'] = detection['bbox']
+        if track['t_last'] is None or timestamp >= track['t_last']:
+            track['t_last'], track['last_frame'] = timestamp, frame_idx
+            track['last_bbox'] = detection['bbox']
+            track['t_end'] = timestamp + interval
+        track['detections_count'] += 1
+        track['score_sum'] += score
+        track['max_score'] = max(track['max_score'], score)
+        track['min_score'] = min(track['min_score'], score)
+
+        if track['best'] is None or score > track['best']['confidence']:
+            track['best'] = {
+                'frame_number': frame_idx,
+                'timestamp': timestamp,
+                'bbox': detection['bbox'],
+                'confidence': score
+            }
+            track['best_crop'] = self.crop(frame, detection['bbox']).copy()
+            track['best_frame'] = frame
+
+    def summary(self, track: Dict) -> Dict:
+        """Score summary of a track"""
+        count = track['detections_count']
+        return {
+            'detections_count': count,
+            'avg_score': round(track['score_sum'] / count, 3) if count else 0.0,
+            'max_score': round(track['max_score'], 3),
+            'min_score': round(track['min_score'], 3) if count else None
+        }
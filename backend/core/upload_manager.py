@@ -0,0 +1,103 @@
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Dict, List, Union
+
+import numpy as np
+
+from backend.database.supabase_client import supabase_client
+from backend.core.config import UPLOAD_CONCURRENCY, UPLOAD_MAX_RETRIES, UPLOAD_RETRY_BASE_DELAY
+
+logger = logging.getLogger(__name__)
+
+class UploadManager:
+    """
+    Storage uploads with bounded parallelism, retries and latency metrics
+    At most concurrency uploads run at once; a failed upload is retried max_retries times,
+    waiting base_delay * 2^attempt between attempts. upload() waits for the public URL
+    (use it when a DB row references the URL); submit() starts the upload in the background
+    and returns a task that the job gathers with wait() before it finishes.
+    A source is either a local file path (original videos and images) or encoded JPEG bytes.
+    """
+
+    def __init__(self, client=supabase_client, concurrency: int = UPLOAD_CONCURRENCY,
+                 max_retries: int = UPLOAD_MAX_RETRIES, base_delay: float = UPLOAD_RETRY_BASE_DELAY):
+        self.client = client
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max(0, max_retries)
+        self.base_delay = max(0.0, base_delay)
+        self._semaphore = None
+        self._loop = None
+        self._latencies = deque(maxlen=1000)
+        self.uploads = 0
+        self.failures = 0
+        self.retries = 0
+        self.bytes_uploaded = 0
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # A semaphore belongs to one event loop
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._loop = loop
+        return self._semaphore
+
+    async def upload(self, source: Union[str, bytes], bucket: str, destination_path: str) -> str:
+        """Upload source and return its public URL"""
+        async with self._get_semaphore():
+            size = len(source) if isinstance(source, bytes) else os.path.getsize(source)
+            for attempt in range(self.max_retries + 1):
+                started = time.perf_counter()
+                try:
+                    # A retry may follow an upload that reached storage, so it overwrites
+                    if isinstance(source, bytes):
+                        url = await self.client.upload_bytes_to_storage(
+                            source, bucket, destination_path, upsert=attempt > 0
+                        )
+                    else:
+                        url = await self.client.upload_file_to_storage(
+                            source, bucket, destination_path, upsert=attempt > 0
+                        )
+                except Exception as e:
+                    if attempt == self.max_retries:
+                        self.failures += 1
+                        raise
+                    delay = self.base_delay * 2 ** attempt
+                    logger.warning(f"Upload of {destination_path} failed ({e}), retrying in {delay:.1f}s")
+                    self.retries += 1
+                    await asyncio.sleep(delay)
+                    continue
+                self._latencies.append(time.perf_counter() - started)
+                self.uploads += 1
+                self.bytes_uploaded += size
+                return url
+
+    def submit(self, source: Union[str, bytes], bucket: str, destination_path: str) -> asyncio.Task:
+        """Start an upload whose URL nothing waits for"""
+        return asyncio.create_task(self.upload(source, bucket, destination_path))
+
+    async def wait(self, tasks: List[asyncio.Task]):
+        """Wait for background uploads; raises the first failure once all of them are done"""
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        tasks.clear()
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+    def stats(self) -> Dict:
+        latencies = np.array(self._latencies) * 1000
+        return {
+            'concurrency': self.concurrency,
+            'uploads': self.uploads,
+            'failures': self.failures,
+            'retries': self.retries,
+            'bytes_uploaded': self.bytes_uploaded,
+            'avg_latency_ms': round(float(latencies.mean()), 1) if len(latencies) else 0.0,
+            'p50_latency_ms': round(float(np.percentile(latencies, 50)), 1) if len(latencies) else 0.0,
+            'p95_latency_ms': round(float(np.percentile(latencies, 95)), 1) if len(latencies) else 0.0
+        }
+
+# Global instance
+upload_manager = UploadManager()
@@ -1,77 +1,291 @@
 import cv2
 import os
 import numpy as np
-from typing import List, Tuple, Dict
+from typing import List, Tuple, Dict, Iterator
+import json
+import hashlib
 import logging
+import threading
+from collections import OrderedDict
 from pathlib import Path
+from backend.core.config import (
+    FRAME_SAMPLING_STRATEGY, FRAME_SEEK_MIN_INTERVAL, VIDEO_METADATA_CACHE_DIR, VIDEO_METADATA_CACHE_SIZE
+)
 
 logger = logging.getLogger(__name__)
 
+class FrameReader:
+    """
+    Random-access frame reader over one open capture
+    Short forward jumps are grabbed, anything else seeks
+    """
+    
+    def __init__(self, video_path: str, cap: cv2.VideoCapture = None):
+        self.cap = cap if cap is not None else cv2.VideoCapture(video_path)
+        if not self.cap.isOpened():
+            raise Exception(f"Could not open video: {video_path}")
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS)
+        self.next_position = int(self.cap.get(cv2.CAP_PROP_POS_FRAMES))
+    
+    def read(self, frame_number: int):
+        """Return the frame at frame_number, or None past the end of the video"""
+        gap = frame_number - self.next_position
+        if gap < 0 or gap >= FRAME_SEEK_MIN_INTERVAL:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+        else:
+            for _ in range(gap):
+                if not self.cap.grab():
+                    return None
+        
+        ret, frame = self.cap.read()
+        self.next_position = frame_number + 1
+        return frame if ret else None
+    
+    def release(self):
+        self.cap.release()
+
+def letterbox(frame: np.ndarray, size: int, stride: int = 32) -> Tuple[np.ndarray, Tuple[float, int, int]]:
+    """
+    Resize frame so its long side is size and pad the short side up to a multiple of stride
+    Same geometry as the model's own rectangular preprocessing, so the model does no further resizing
+    Returns the letterboxed image and (scale, pad_x, pad_y) to map boxes back
+    """
+    h, w = frame.shape[:2]
+    scale = min(size / h, size / w)
+    new_w, new_h = int(round(w * scale)), int(round(h * scale))
+    pad_w = (stride - new_w % stride) % stride
+    pad_h = (stride - new_h % stride) % stride
+    pad_x, pad_y = pad_w // 2, pad_h // 2
+    
+    resized = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_AREA) if scale != 1 else frame
+    image = cv2.copyMakeBorder(
+        resized, pad_y, pad_h - pad_y, pad_x, pad_w - pad_x, cv2.BORDER_CONSTANT, value=(114, 114, 114)
+    )
+    return image, (scale, pad_x, pad_y)
+
+def rescale_detections(detections: List[Dict], params: Tuple[float, int, int], original_shape: Tuple[int, int]) -> List[Dict]:
+    """Map bboxes from letterboxed coordinates back to the original frame (in place)"""
+    if hasattr(detections, 'rescale'):
+        # Columnar results rescale all boxes in one array operation
+        return detections.rescale(params, original_shape)
+    scale, pad_x, pad_y = params
+    h, w = original_shape[:2]
+    for detection in detections:
+        x1, y1, x2, y2 = detection['bbox']
+        detection['bbox'] = [
+            float(min(max((x1 - pad_x) / scale, 0), w)),
+            float(min(max((y1 - pad_y) / scale, 0), h)),
+            float(min(max((x2 - pad_x) / scale, 0), w)),
+            float(min(max((y2 - pad_y) / scale, 0), h))
+        ]
+    return detections
+
+class FrameHandle:
+    """Model-sized copy of a sampled frame plus lazy access to the full-resolution original"""
+    
+    def __init__(self, loader: 'FullFrameLoader', frame_number: int, inference_frame: np.ndarray):
+        self.loader = loader
+        self.frame_number = frame_number
+        self.inference_frame = inference_frame
+    
+    def load(self) -> np.ndarray:
+        """Decode the full-resolution frame again (only needed for crops and captures)"""
+        return self.loader.load(self.frame_number)
+
+class FullFrameLoader:
+    """
+    Letterbox sampled frames to the model input size and reload full frames on demand
+    Only the model-sized copies travel through the pipeline; the few frames that need crops
+    or captures are decoded again from the video through a separate reader.
+    """
+    
+    def __init__(self, video_path: str, inference_size: int):
+        self.video_path = video_path
+        self.inference_size = inference_size
+        self.params = None
+        self.original_shape = None
+        self._reader = None
+        self._lock = threading.Lock()
+    
+    def handle(self, frame_number: int, frame: np.ndarray) -> FrameHandle:
+        inference_frame, self.params = letterbox(frame, self.inference_size)
+        self.original_shape = frame.shape[:2]
+        return FrameHandle(self, frame_number, inference_frame)
+    
+    def rescale_detections(self, detections: List[Dict]) -> List[Dict]:
+        """Map bboxes from letterboxed coordinates back to the original frame"""
+        if self.params is None:
+            return detections
+        return rescale_detections(detections, self.params, self.original_shape)
+    
+    def load(self, frame_number: int) -> np.ndarray:
+        with self._lock:
+            if self._reader is None:
+                self._reader = FrameReader(self.video_path)
+            frame = self._reader.read(frame_number)
+        if frame is None:
+            raise Exception(f"Could not reload frame {frame_number} from {self.video_path}")
+        return frame
+    
+    def release(self):
+        with self._lock:
+            if self._reader is not None:
+                self._reader.release()
+                self._reader = None
+
+class VideoProbe:
+    """
+    One open capture of a video plus its metadata
+    Pass it to iter_frames/iter_frame_batches so sampling reuses the capture instead of
+    opening the container again. Call release() when done.
+    """
+    
+    def __init__(self, video_path: str, cap: cv2.VideoCapture, info: Dict):
+        self.video_path = video_path
+        self.cap = cap
+        self.info = info
+    
+    def release(self):
+        self.cap.release()
+
 class VideoProcessor:
     def __init__(self):
-        pass
+        # Video metadata keyed by content hash, most recently used last
+        self._metadata_cache = OrderedDict()
+        self._metadata_lock = threading.Lock()
     
     def get_video_info(self, video_path: str) -> Dict:
-        """Get video information (duration, fps, frame count)"""
+        """Get video information (duration, fps, frame count, resolution, codec)"""
+        probe = self.probe(video_path)
+        probe.release()
+        return probe.info
+    
+    def probe(self, video_path: str) -> VideoProbe:
+        """
+        Open the video once and read its metadata
+        Metadata is cached by content hash, so reprocessing the same file skips the probe
+        (including the frame count scan for containers that misreport it)
+        """
         try:
             cap = cv2.VideoCapture(video_path)
             
             if not cap.isOpened():
                 raise Exception(f"Could not open video: {video_path}")
             
-            fps = cap.get(cv2.CAP_PROP_FPS)
-            frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            duration = frame_count / fps if fps > 0 else 0
-            
-            cap.release()
+            content_hash = self._content_hash(video_path)
+            info = self._get_cached_metadata(content_hash)
+            if info is None:
+                info = self._read_metadata(cap)
+                info['content_hash'] = content_hash
+                self._store_metadata(content_hash, info)
+            else:
+                logger.info(f"Video metadata cache hit for {video_path}")
             
-            return {
-                'fps': fps,
-                'frame_count': frame_count,
-                'duration_seconds': duration
-            }
+            return VideoProbe(video_path, cap, dict(info))
         except Exception as e:
             logger.error(f"Error getting video info: {e}")
             raise
     
+    def _read_metadata(self, cap: cv2.VideoCapture) -> Dict:
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        fourcc = int(cap.get(cv2.CAP_PROP_FOURCC))
+        codec = "".join(chr((fourcc >> (8 * i)) & 0xFF) for i in range(4)).strip("\x00 ") if fourcc > 0 else None
+        
+        # CAP_PROP_FRAME_COUNT comes from container headers and is wrong for some files:
+        # check that the last reported frame exists, otherwise count the frames
+        frame_count_source = 'header'
+        if not self._frame_exists(cap, frame_count - 1) or self._frame_exists(cap, frame_count):
+            frame_count = self._count_frames(cap)
+            frame_count_source = 'scan'
+        cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        
+        return {
+            'fps': fps,
+            'frame_count': frame_count,
+            'duration_seconds': frame_count / fps if fps > 0 else 0,
+            'width': int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            'height': int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            'codec': codec,
+            'frame_count_source': frame_count_source
+        }
+    
+    def _frame_exists(self, cap: cv2.VideoCapture, frame_number: int) -> bool:
+        if frame_number < 0:
+            return False
+        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+        return cap.grab()
+    
+    def _count_frames(self, cap: cv2.VideoCapture) -> int:
+        """
+        Count frames by grabbing every frame of the stream
+        grab() still decodes each frame (only the conversion to BGR is skipped), so this costs
+        about as much as reading the whole video; it only runs when the header count is wrong
+        """
+        cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        frame_count = 0
+        while cap.grab():
+            frame_count += 1
+        return frame_count
+    
+    def _content_hash(self, video_path: str) -> str:
+        digest = hashlib.blake2b(digest_size=20)
+        with open(video_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+    
+    def _get_cached_metadata(self, content_hash: str):
+        with self._metadata_lock:
+            if content_hash in self._metadata_cache:
+                self._metadata_cache.move_to_end(content_hash)
+                return self._metadata_cache[content_hash]
+        
+        if VIDEO_METADATA_CACHE_DIR:
+            cache_path = os.path.join(VIDEO_METADATA_CACHE_DIR, f"{content_hash}.json")
+            try:
+                with open(cache_path) as f:
+                    info = json.load(f)
+            except (OSError, ValueError):
+                return None
+            self._remember_metadata(content_hash, info)
+            return info
+        return None
+    
+    def _store_metadata(self, content_hash: str, info: Dict):
+        self._remember_metadata(content_hash, info)
+        if VIDEO_METADATA_CACHE_DIR:
+            try:
+                os.makedirs(VIDEO_METADATA_CACHE_DIR, exist_ok=True)
+                with open(os.path.join(VIDEO_METADATA_CACHE_DIR, f"{content_hash}.json"), 'w') as f:
+                    json.dump(info, f)
+            except OSError as e:
+                logger.warning(f"Could not write video metadata cache: {e}")
+    
+    def _remember_metadata(self, content_hash: str, info: Dict):
+        with self._metadata_lock:
+            self._metadata_cache[content_hash] = info
+            self._metadata_cache.move_to_end(content_hash)
+            while len(self._metadata_cache) > VIDEO_METADATA_CACHE_SIZE:
+                self._metadata_cache.popitem(last=False)
+    
     def extract_frames(self, video_path: str, output_dir: str, target_fps: float = 1.0) -> List[str]:
         """
         Extract frames from video at specified FPS
         Returns list of frame file paths
         """
         try:
-            cap = cv2.VideoCapture(video_path)
-            
-            if not cap.isOpened():
-                raise Exception(f"Could not open video: {video_path}")
-            
             # Create output directory
             os.makedirs(output_dir, exist_ok=True)
             
-            video_fps = cap.get(cv2.CAP_PROP_FPS)
-            frame_interval = int(video_fps / target_fps) if target_fps > 0 else 1
-            
             frame_paths = []
-            frame_number = 0
-            saved_frame_count = 0
-            
-            while True:
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                
-                # Extract frame at specified interval
-                if frame_number % frame_interval == 0:
-                    frame_filename = f"frame_{saved_frame_count:06d}.jpg"
-                    frame_path = os.path.join(output_dir, frame_filename)
-                    
-                    cv2.imwrite(frame_path, frame)
-                    frame_paths.append(frame_path)
-                    saved_frame_count += 1
+            for saved_frame_count, (_, _, frame) in enumerate(self.iter_frames(video_path, target_fps)):
+                frame_filename = f"frame_{saved_frame_count:06d}.jpg"
+                frame_path = os.path.join(output_dir, frame_filename)
                 
-                frame_number += 1
+                cv2.imwrite(frame_path, frame)
+                frame_paths.append(frame_path)
             
-            cap.release()
             logger.info(f"Extracted {len(frame_paths)} frames from {video_path}")
             return frame_paths
             
@@ -79,6 +293,132 @@ class VideoProcessor:
             logger.error(f"Error extracting frames: {e}")
             raise
     
+    def choose_sampling_strategy(self, frame_interval: int, strategy: str = None) -> str:
+        """
+        Pick how unsampled frames are skipped:
+        - read: decode and convert every frame (baseline)
+        - grab: grab() skipped frames without retrieve(), avoiding the color conversion and copy
+        - seek: jump straight to the next sampled frame; the decoder restarts from the
+          closest keyframe, so it only pays off when the gap is larger than a GOP
+        """
+        strategy = strategy or FRAME_SAMPLING_STRATEGY
+        if strategy != "auto":
+            return strategy
+        if frame_interval <= 1:
+            return "read"
+        if frame_interval >= FRAME_SEEK_MIN_INTERVAL:
+            return "seek"
+        return "grab"
+    
+    def get_frame_interval(self, video_fps: float, target_fps: float) -> int:
+        """Number of source frames between two sampled frames"""
+        return max(1, int(video_fps / target_fps)) if target_fps > 0 else 1
+    
+    def iter_frames(self, video_path: str, target_fps: float = 1.0, strategy: str = None,
+                    start_frame: int = 0, end_frame: int = None,
+                    frame_loader: FullFrameLoader = None,
+                    probe: VideoProbe = None) -> Iterator[Tuple[int, float, np.ndarray]]:
+        """
+        Stream frames from video at specified FPS without writing them to disk
+        Yields (frame_index, timestamp, frame) where frame_index is the source frame number
+        start_frame/end_frame restrict sampling to [start_frame, end_frame) on the same
+        sampling grid as a full pass, so segments of a video can be processed independently
+        With a frame_loader, frame is a FrameHandle holding a model-sized copy instead
+        With a probe, its already open capture is used (and left open)
+        """
+        if probe is not None:
+            cap = probe.cap
+        else:
+            cap = cv2.VideoCapture(video_path)
+        
+        if not cap.isOpened():
+            raise Exception(f"Could not open video: {video_path}")
+        
+        try:
+            video_fps = cap.get(cv2.CAP_PROP_FPS)
+            frame_interval = self.get_frame_interval(video_fps, target_fps)
+            strategy = self.choose_sampling_strategy(frame_interval, strategy)
+            
+            # Align the first frame to the sampling grid
+            start_frame = -(-start_frame // frame_interval) * frame_interval
+            if start_frame > 0 or (probe is not None and cap.get(cv2.CAP_PROP_POS_FRAMES) != 0):
+                cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+            
+            if strategy == "seek":
+                frames = self._seek_sampled_frames(cap, frame_interval, start_frame)
+            elif strategy == "grab":
+                frames = self._grab_sampled_frames(cap, frame_interval, start_frame)
+            elif strategy == "read":
+                frames = self._read_sampled_frames(cap, frame_interval, start_frame)
+            else:
+                raise ValueError(f"Unknown frame sampling strategy: {strategy}")
+            
+            sampled_count = 0
+            for frame_number, frame in frames:
+                if end_frame is not None and frame_number >= end_frame:
+                    break
+                timestamp = frame_number / video_fps if video_fps > 0 else 0.0
+                sampled_count += 1
+                if frame_loader is not None:
+                    frame = frame_loader.handle(frame_number, frame)
+                yield frame_number, timestamp, frame
+            
+            logger.info(f"Streamed {sampled_count} frames from {video_path} (strategy={strategy}, interval={frame_interval})")
+        finally:
+            if probe is None:
+                cap.release()
+    
+    def iter_frame_batches(self, video_path: str, target_fps: float = 1.0, batch_size: int = 8,
+                           start_frame: int = 0, end_frame: int = None,
+                           frame_loader: FullFrameLoader = None,
+                           probe: VideoProbe = None) -> Iterator[List[Tuple[int, float, np.ndarray]]]:
+        """Group streamed frames into lists of at most batch_size (frame_index, timestamp, frame)"""
+        batch = []
+        for item in self.iter_frames(video_path, target_fps, start_frame=start_frame, end_frame=end_frame,
+                                     frame_loader=frame_loader, probe=probe):
+            batch.append(item)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    
+    def _read_sampled_frames(self, cap: cv2.VideoCapture, frame_interval: int, start_frame: int = 0) -> Iterator[Tuple[int, np.ndarray]]:
+        """Decode every frame and keep one every frame_interval"""
+        frame_number = start_frame
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if frame_number % frame_interval == 0:
+                yield frame_number, frame
+            frame_number += 1
+    
+    def _grab_sampled_frames(self, cap: cv2.VideoCapture, frame_interval: int, start_frame: int = 0) -> Iterator[Tuple[int, np.ndarray]]:
+        """Advance over skipped frames with grab() and only retrieve() sampled ones"""
+        frame_number = start_frame
+        while True:
+            if not cap.grab():
+                break
+            if frame_number % frame_interval == 0:
+                ret, frame = cap.retrieve()
+                if not ret:
+                    break
+                yield frame_number, frame
+            frame_number += 1
+    
+    def _seek_sampled_frames(self, cap: cv2.VideoCapture, frame_interval: int, start_frame: int = 0) -> Iterator[Tuple[int, np.ndarray]]:
+        """Seek directly to each sampled frame"""
+        frame_number = start_frame
+        while True:
+            if frame_number > start_frame:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+            ret, frame = cap.read()
+            if not ret:
+                break
+            yield frame_number, frame
+            frame_number += frame_interval
+    
     def get_frame_timestamp(self, frame_index: int, video_fps: float) -> Tuple[float, float]:
         """
         Get start and end timestamp for a frame
@@ -88,27 +428,12 @@ class VideoProcessor:
         t_end = t_start + frame_duration
         return t_start, t_end
     
-    def save_frame_crop(self, frame: np.ndarray, crop_dir: str, filename: str) -> str:
-        """Save cropped frame to directory"""
-        try:
-            os.makedirs(crop_dir, exist_ok=True)
-            crop_path = os.path.join(crop_dir, filename)
-            cv2.imwrite(crop_path, frame)
-            return crop_path
-        except Exception as e:
-            logger.error(f"Error saving frame crop: {e}")
-            raise
-    
-    def save_full_frame(self, frame: np.ndarray, frames_dir: str, filename: str) -> str:
-        """Save complete frame to directory for detection context"""
-        try:
-            os.makedirs(frames_dir, exist_ok=True)
-            frame_path = os.path.join(frames_dir, filename)
-            cv2.imwrite(frame_path, frame)
-            return frame_path
-        except Exception as e:
-            logger.error(f"Error saving full frame: {e}")
-            raise
+    def encode_jpeg(self, image: np.ndarray) -> bytes:
+        """Encode a frame or crop as JPEG in memory, ready to upload"""
+        ok, buffer = cv2.imencode('.jpg', image)
+        if not ok:
+            raise Exception(f"Could not encode image of shape {image.shape}")
+        return buffer.tobytes()
 
 # Global instance
 video_processor = VideoProcessor()
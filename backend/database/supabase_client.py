@@ -1,84 +1,241 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+import httpx
 from supabase import create_client, Client
-from backend.core.config import SUPABASE_URL, SUPABASE_SERVICE_ROLE
+from backend.core.config import (
+    SUPABASE_URL, SUPABASE_SERVICE_ROLE, SUPABASE_IO_WORKERS,
+    DB_INSERT_CHUNK_SIZE, DB_INSERT_MAX_RETRIES, DB_INSERT_RETRY_BASE_DELAY
+)
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Failures before the request left the client: retrying them cannot store the rows twice
+_NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
 class SupabaseClient:
-    def __init__(self):
+    """
+    Async facade over the synchronous supabase client
+    Every HTTP call runs on a dedicated I/O thread pool, so awaiting a method never blocks
+    the event loop (and database calls don't compete with CPU work for the default executor)
+    """
+
+    def __init__(self, io_workers: int = SUPABASE_IO_WORKERS):
         self.client: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE)
-    
-    async def upload_file_to_storage(self, file_path: str, bucket: str, destination_path: str) -> str:
-        """Upload file to Supabase storage"""
+        self._executor = ThreadPoolExecutor(max_workers=max(1, io_workers), thread_name_prefix="supabase-io")
+        # Brand name -> id; the table is small and rows are never deleted, so entries never go stale
+        self._brand_ids: Dict[str, int] = {}
+        self._brand_upserts: Dict[str, asyncio.Task] = {}
+
+    async def _run(self, func, *args, **kwargs):
+        """Run a blocking call on the I/O pool"""
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, functools.partial(func, *args, **kwargs)
+        )
+
+    async def execute(self, query):
+        """Execute a query built on self.client (select/insert/...) without blocking the event loop"""
+        return await self._run(query.execute)
+
+    def _upload(self, file, bucket: str, destination_path: str, upsert: bool, content_type: str = None) -> str:
+        file_options = {}
+        if upsert:
+            file_options['upsert'] = 'true'
+        if content_type:
+            file_options['content-type'] = content_type
+        response = self.client.storage.from_(bucket).upload(destination_path, file, file_options=file_options or None)
+
+        # Supabase storage upload returns different response format
+        # Check if upload was successful and get public URL
+        if response:
+            # Get public URL
+            return self.client.storage.from_(bucket).get_public_url(destination_path)
+        else:
+            raise Exception(f"Upload failed: {response}")
+
+    async def upload_file_to_storage(self, file_path: str, bucket: str, destination_path: str,
+                                     upsert: bool = False) -> str:
+        """Upload file to Supabase storage (upsert overwrites an existing object)"""
         try:
-            with open(file_path, 'rb') as f:
-                response = self.client.storage.from_(bucket).upload(destination_path, f)
-            
-            # Supabase storage upload returns different response format
-            # Check if upload was successful and get public URL
-            if response:
-                # Get public URL
-                public_url = self.client.storage.from_(bucket).get_public_url(destination_path)
-                logger.info(f"File uploaded successfully: {destination_path}")
-                return public_url
-            else:
-                raise Exception(f"Upload failed: {response}")
+            public_url = await self._run(self._upload_file, file_path, bucket, destination_path, upsert)
+            logger.info(f"File uploaded successfully: {destination_path}")
+            return public_url
         except Exception as e:
             logger.error(f"Error uploading file: {e}")
             raise
-    
+
+    def _upload_file(self, file_path: str, bucket: str, destination_path: str, upsert: bool) -> str:
+        with open(file_path, 'rb') as f:
+            return self._upload(f, bucket, destination_path, upsert)
+
+    async def upload_bytes_to_storage(self, data: bytes, bucket: str, destination_path: str,
+                                      content_type: str = 'image/jpeg', upsert: bool = False) -> str:
+        """Upload an in-memory buffer (encoded frame or crop) to Supabase storage"""
+        try:
+            public_url = await self._run(self._upload, data, bucket, destination_path, upsert, content_type)
+            logger.info(f"File uploaded successfully: {destination_path}")
+            return public_url
+        except Exception as e:
+            logger.error(f"Error uploading file: {e}")
+            raise
+
     async def insert_file_record(self, file_data: dict) -> int:
         """Insert file record into files table"""
         try:
-            response = self.client.table('files').insert(file_data).execute()
+            response = await self.execute(self.client.table('files').insert(file_data))
             return response.data[0]['id']
         except Exception as e:
             logger.error(f"Error inserting file record: {e}")
             raise
-    
+
     async def insert_detection(self, detection_data: dict) -> int:
         """Insert detection record"""
         try:
-            response = self.client.table('detections').insert(detection_data).execute()
+            response = await self.execute(self.client.table('detections').insert(detection_data))
             return response.data[0]['id']
         except Exception as e:
             logger.error(f"Error inserting detection: {e}")
             raise
-    
+
     async def insert_prediction(self, prediction_data: dict) -> int:
         """Insert prediction record"""
         try:
-            response = self.client.table('predictions').insert(prediction_data).execute()
+            response = await self.execute(self.client.table('predictions').insert(prediction_data))
             return response.data[0]['id']
         except Exception as e:
             logger.error(f"Error inserting prediction: {e}")
             raise
-    
+
+    async def load_brands(self) -> int:
+        """Fill the brand cache with every existing brand; returns the number of brands"""
+        response = await self.execute(self.client.table('brands').select('id, name'))
+        self._brand_ids.update({row['name']: row['id'] for row in response.data})
+        logger.info(f"Loaded {len(response.data)} brands")
+        return len(response.data)
+
     async def get_or_create_brand(self, brand_name: str) -> int:
-        """Get brand ID or create new brand"""
+        """
+        Get brand ID or create new brand
+        Served from the in-memory cache; a miss runs one upsert per name, shared by concurrent callers
+        """
+        if brand_name in self._brand_ids:
+            return self._brand_ids[brand_name]
+        upsert = self._brand_upserts.get(brand_name)
+        if upsert is None:
+            upsert = asyncio.ensure_future(self._upsert_brand(brand_name))
+            self._brand_upserts[brand_name] = upsert
+            upsert.add_done_callback(lambda _: self._brand_upserts.pop(brand_name, None))
+        return await asyncio.shield(upsert)
+
+    async def _upsert_brand(self, brand_name: str) -> int:
         try:
-            # Try to get existing brand
-            response = self.client.table('brands').select('id').eq('name', brand_name).execute()
-            
-            if response.data:
-                return response.data[0]['id']
-            else:
-                # Create new brand
-                response = self.client.table('brands').insert({'name': brand_name}).execute()
-                return response.data[0]['id']
+            # ON CONFLICT (name): returns the existing row when another process created it first
+            response = await self.execute(
+                self.client.table('brands').upsert({'name': brand_name}, on_conflict='name')
+            )
+            brand_id = response.data[0]['id']
+            self._brand_ids[brand_name] = brand_id
+            return brand_id
         except Exception as e:
             logger.error(f"Error getting/creating brand: {e}")
             raise
-    
+
     async def insert_frame_capture(self, frame_capture_data: dict) -> int:
         """Insert frame capture record"""
         try:
-            response = self.client.table('frame_captures').insert(frame_capture_data).execute()
+            response = await self.execute(self.client.table('frame_captures').insert(frame_capture_data))
             return response.data[0]['id']
         except Exception as e:
             logger.warning(f"Frame capture insertion failed (table may not exist): {e}")
             # Return a mock ID so processing can continue
             return 0
 
+    async def insert_rows(self, table: str, rows: List[dict], chunk_size: int = DB_INSERT_CHUNK_SIZE) -> List[int]:
+        """
+        Insert rows with one request per chunk_size rows; returns the new ids in row order
+        A chunk is one statement, so it is stored entirely or not at all:
+        - errors where the request never reached the server (connect errors and timeouts, no free
+          connection) are retried with exponential backoff
+        - a chunk rejected for its data (Postgres error classes 22/23) is split in halves until the
+          offending rows are isolated, so the valid rows still get inserted
+        - any other error rejects the whole chunk without retrying: an insert is not idempotent, and
+          after a read timeout or dropped response the chunk may already be stored, so a retry
+          could duplicate every row
+        Rejected rows get None ids and an Exception listing them is raised once all chunks ran
+        """
+        ids, rejected = [], []
+        for start in range(0, len(rows), max(1, chunk_size)):
+            ids.extend(await self._insert_chunk(table, rows[start:start + chunk_size], rejected))
+        if rejected:
+            errors = "; ".join(f"{row}: {error}" for row, error in rejected[:3])
+            raise Exception(f"{len(rejected)} of {len(rows)} rows rejected by {table}: {errors}")
+        return ids
+
+    async def _insert_chunk(self, table: str, rows: List[dict], rejected: List) -> List[int]:
+        for attempt in range(DB_INSERT_MAX_RETRIES + 1):
+            try:
+                response = await self.execute(self.client.table(table).insert(rows))
+                return [row['id'] for row in response.data]
+            except Exception as e:
+                code = getattr(e, 'code', None)
+                if isinstance(e, _NOT_SENT_ERRORS) and attempt < DB_INSERT_MAX_RETRIES:
+                    delay = DB_INSERT_RETRY_BASE_DELAY * 2 ** attempt
+                    logger.warning(f"Bulk insert into {table} could not connect ({e}), retrying in {delay:.1f}s")
+                    await asyncio.sleep(delay)
+                    continue
+                if len(rows) == 1 or str(code)[:2] not in ('22', '23'):
+                    unknown = " (no response, they may have been stored)" if code is None else ""
+                    logger.error(f"{len(rows)} rows rejected by {table}{unknown}: {e}")
+                    rejected.extend((row, e) for row in rows)
+                    return [None] * len(rows)
+                # Bisect so one bad row doesn't take the whole chunk down
+                middle = len(rows) // 2
+                return (await self._insert_chunk(table, rows[:middle], rejected) +
+                        await self._insert_chunk(table, rows[middle:], rejected))
+
+    async def insert_detections(self, rows: List[dict]) -> List[int]:
+        """Bulk insert detection records"""
+        return await self.insert_rows('detections', rows)
+
+    async def insert_predictions(self, rows: List[dict]) -> List[int]:
+        """Bulk insert prediction records"""
+        return await self.insert_rows('predictions', rows)
+
+    async def insert_frame_captures(self, rows: List[dict]) -> List[int]:
+        """Bulk insert frame capture records (failures are tolerated like insert_frame_capture)"""
+        try:
+            return await self.insert_rows('frame_captures', rows)
+        except Exception as e:
+            logger.warning(f"Frame capture insertion failed (table may not exist): {e}")
+            return [0] * len(rows)
+
+    def shutdown(self):
+        """Wait for in-flight calls and stop the I/O threads"""
+        self._executor.shutdown(wait=True)
+
+class RowBuffer:
+    """
+    Rows of one table collected during a job and written with a bulk insert
+    add() flushes once chunk_size rows are pending; flush() writes the rest at the end of the job
+    """
+
+    def __init__(self, insert, chunk_size: int = DB_INSERT_CHUNK_SIZE):
+        self.insert = insert
+        self.chunk_size = max(1, chunk_size)
+        self.rows = []
+        self.ids = []
+
+    async def add(self, row: dict):
+        self.rows.append(row)
+        if len(self.rows) >= self.chunk_size:
+            await self.flush()
+
+    async def flush(self):
+        rows, self.rows = self.rows, []
+        if rows:
+            self.ids.extend(await self.insert(rows))
+
 # Global instance
 supabase_client = SupabaseClient()
@@ -0,0 +1,56 @@
+import logging
+from typing import Dict, Iterable
+
+logger = logging.getLogger(__name__)
+
+# Values of DetectionResult.cascade
+PASSED = "passed"  # Screening found a candidate, full model ran
+REJECTED = "rejected"  # Screening found nothing, full model skipped
+AUDITED = "audited"  # Screening found nothing, full model ran anyway to measure misses
+
+class CascadeStats:
+    """
+    Screening counters of one job, folded in from the DetectionResults it received
+    Rejected frames are audited at a fixed rate; the share of audited frames where the
+    full model still found logos estimates how many positives screening throws away.
+    Results that were not screened (cache hits, propagated by the frame gate, tiled) are ignored.
+    """
+
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self.frames_passed = 0
+        self.passed_with_detections = 0
+        self.frames_rejected = 0
+        self.frames_audited = 0
+        self.audited_with_detections = 0
+
+    def add(self, batch_detections: Iterable):
+        for detections in batch_detections:
+            outcome = getattr(detections, 'cascade', None)
+            if outcome == PASSED:
+                self.frames_passed += 1
+                self.passed_with_detections += len(detections) > 0
+            elif outcome == REJECTED:
+                self.frames_rejected += 1
+            elif outcome == AUDITED:
+                self.frames_rejected += 1
+                self.frames_audited += 1
+                self.audited_with_detections += len(detections) > 0
+
+    def stats(self) -> Dict:
+        screened = self.frames_passed + self.frames_rejected
+        miss_rate = self.audited_with_detections / self.frames_audited if self.frames_audited else 0.0
+        # Audited frames got full-model results, only the unaudited rejections can be lost
+        estimated_missed = (self.frames_rejected - self.frames_audited) * miss_rate
+        estimated_positives = self.passed_with_detections + self.frames_rejected * miss_rate
+        return {
+            'enabled': self.enabled,
+            'frames_screened': screened,
+            'frames_passed': self.frames_passed,
+            'frames_rejected': self.frames_rejected,
+            'pass_rate': round(self.frames_passed / screened, 3) if screened else 0.0,
+            'frames_audited': self.frames_audited,
+            'audited_with_detections': self.audited_with_detections,
+            'estimated_missed_frames': round(estimated_missed, 1),
+            'estimated_recall_loss': round(estimated_missed / estimated_positives, 3) if estimated_positives else 0.0
+        }
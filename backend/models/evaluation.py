@@ -0,0 +1,140 @@
+import logging
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import cv2
+import numpy as np
+
+from backend.core.config import INFERENCE_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+def load_labelled_dataset(dataset_dir: str) -> List[Tuple[str, str]]:
+    """
+    (image_path, label_path) pairs of a YOLO-format sample set
+    Expects dataset_dir/images/* and dataset_dir/labels/<same name>.txt with
+    "class_id cx cy w h" lines in normalized coordinates; images without a label file have no objects
+    """
+    images_dir = Path(dataset_dir) / "images"
+    labels_dir = Path(dataset_dir) / "labels"
+    return [
+        (str(path), str(labels_dir / f"{path.stem}.txt"))
+        for path in sorted(images_dir.rglob("*")) if path.suffix.lower() in IMAGE_EXTENSIONS
+    ]
+
+def read_labels(label_path: str, width: int, height: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Ground-truth (class_ids, xyxy boxes in pixels) of one image"""
+    if not Path(label_path).exists():
+        return np.zeros(0, dtype=np.int64), np.zeros((0, 4), dtype=np.float32)
+    rows = np.loadtxt(label_path, ndmin=2, dtype=np.float32)
+    if rows.size == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros((0, 4), dtype=np.float32)
+    cx, cy, w, h = rows[:, 1] * width, rows[:, 2] * height, rows[:, 3] * width, rows[:, 4] * height
+    boxes = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+    return rows[:, 0].astype(np.int64), boxes
+
+def box_iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """IoU of every box in a (N, 4) against every box in b (M, 4)"""
+    ix1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    iy1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    ix2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    iy2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    intersection = np.clip(ix2 - ix1, 0, None) * np.clip(iy2 - iy1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - intersection
+    return np.where(union > 0, intersection / np.maximum(union, 1e-9), 0.0)
+
+def average_precision(recall: np.ndarray, precision: np.ndarray) -> float:
+    """Area under the precision envelope (all-point interpolation)"""
+    recall = np.concatenate([[0.0], recall, [1.0]])
+    precision = np.concatenate([[1.0], precision, [0.0]])
+    precision = np.maximum.accumulate(precision[::-1])[::-1]
+    steps = np.nonzero(recall[1:] != recall[:-1])[0]
+    return float(np.sum((recall[steps + 1] - recall[steps]) * precision[steps + 1]))
+
+def evaluate_detector(processor, dataset_dir: str, iou_threshold: float = 0.5,
+                      batch_size: int = INFERENCE_BATCH_SIZE) -> Dict:
+    """
+    Per-brand AP, recall and precision of a YOLOProcessor on a labelled sample set
+    Detections are taken at the service's confidence threshold, so the numbers describe
+    what the pipeline actually reports rather than the full precision/recall curve
+    """
+    samples = load_labelled_dataset(dataset_dir)
+    if not samples:
+        raise Exception(f"No labelled images found in {dataset_dir}")
+
+    # Per class: list of (confidence, is_true_positive) and number of ground-truth boxes
+    scored = {}
+    label_counts = {}
+    for start in range(0, len(samples), batch_size):
+        chunk = samples[start:start + batch_size]
+        images = [cv2.imread(image_path) for image_path, _ in chunk]
+        batch_detections = processor.detect_batch(images, batch_size)
+
+        for (image_path, label_path), image, detections in zip(chunk, images, batch_detections):
+            height, width = image.shape[:2]
+            gt_classes, gt_boxes = read_labels(label_path, width, height)
+            for class_id in gt_classes.tolist():
+                label_counts[class_id] = label_counts.get(class_id, 0) + 1
+
+            # Greedy matching per class, highest confidence first
+            matched = np.zeros(len(gt_classes), dtype=bool)
+            for detection in sorted(detections, key=lambda d: d['confidence'], reverse=True):
+                class_id = detection['class_id']
+                candidates = np.nonzero((gt_classes == class_id) & ~matched)[0]
+                is_tp = False
+                if len(candidates):
+                    ious = box_iou_matrix(np.array([detection['bbox']], dtype=np.float32), gt_boxes[candidates])[0]
+                    best = int(np.argmax(ious))
+                    if ious[best] >= iou_threshold:
+                        matched[candidates[best]] = True
+                        is_tp = True
+                scored.setdefault(class_id, []).append((detection['confidence'], is_tp))
+
+    names = processor.model.names if processor.model is not None else {}
+    per_class = {}
+    for class_id in sorted(set(label_counts) | set(scored)):
+        entries = sorted(scored.get(class_id, []), key=lambda e: e[0], reverse=True)
+        n_labels = label_counts.get(class_id, 0)
+        tp = np.cumsum([is_tp for _, is_tp in entries]) if entries else np.zeros(0)
+        fp = np.cumsum([not is_tp for _, is_tp in entries]) if entries else np.zeros(0)
+        recall_curve = tp / n_labels if n_labels else np.zeros(len(entries))
+        precision_curve = tp / np.maximum(tp + fp, 1)
+        true_positives = int(tp[-1]) if len(tp) else 0
+
+        per_class[names.get(class_id, str(class_id))] = {
+            'labels': n_labels,
+            'detections': len(entries),
+            'ap50': round(average_precision(recall_curve, precision_curve), 4) if n_labels else 0.0,
+            'recall': round(true_positives / n_labels, 4) if n_labels else 0.0,
+            'precision': round(true_positives / len(entries), 4) if entries else 0.0
+        }
+
+    labelled = [metrics for metrics in per_class.values() if metrics['labels']]
+    return {
+        'images': len(samples),
+        'iou_threshold': iou_threshold,
+        'map50': round(float(np.mean([m['ap50'] for m in labelled])), 4) if labelled else 0.0,
+        'recall': round(float(np.mean([m['recall'] for m in labelled])), 4) if labelled else 0.0,
+        'per_class': per_class
+    }
+
+def compare_evaluations(reference: Dict, candidate: Dict) -> Dict:
+    """Per-brand AP50/recall delta of candidate relative to reference (negative means worse)"""
+    per_class = {}
+    for name in sorted(set(reference['per_class']) | set(candidate['per_class'])):
+        ref = reference['per_class'].get(name, {'ap50': 0.0, 'recall': 0.0, 'labels': 0})
+        cand = candidate['per_class'].get(name, {'ap50': 0.0, 'recall': 0.0, 'labels': 0})
+        per_class[name] = {
+            'labels': max(ref['labels'], cand['labels']),
+            'ap50_delta': round(cand['ap50'] - ref['ap50'], 4),
+            'recall_delta': round(cand['recall'] - ref['recall'], 4)
+        }
+    return {
+        'map50_delta': round(candidate['map50'] - reference['map50'], 4),
+        'recall_delta': round(candidate['recall'] - reference['recall'], 4),
+        'per_class': per_class
+    }
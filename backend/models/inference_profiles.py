@@ -0,0 +1,81 @@
+import logging
+from typing import Dict, List, Optional
+
+from backend.core.config import INFERENCE_PROFILES, DEFAULT_INFERENCE_PROFILE
+
+logger = logging.getLogger(__name__)
+
+class InferenceProfile:
+    """
+    Model call settings for one job: input size, confidence, class filter and max detections
+    Built from a spec such as "fast", "accurate", "brands=nike,adidas" or "fast;brands=[nike, adidas]"
+    """
+
+    def __init__(self, name: str, imgsz: int, conf: float, max_det: int, brands: Optional[List[str]] = None):
+        self.name = name
+        self.imgsz = imgsz
+        self.conf = conf
+        self.max_det = max_det
+        self.brands = sorted(brands) if brands else None
+
+    @property
+    def key(self) -> str:
+        """Canonical form of the resolved settings (cache keys, scheduler grouping)"""
+        brands = ",".join(self.brands) if self.brands else "*"
+        return f"{self.name}|imgsz={self.imgsz}|conf={self.conf}|max_det={self.max_det}|brands={brands}"
+
+    def class_ids(self, names: Dict[int, str]) -> Optional[List[int]]:
+        """Model class ids of the profile's brands (None: all classes)"""
+        if not self.brands:
+            return None
+        by_name = {name.lower(): class_id for class_id, name in names.items()}
+        unknown = [brand for brand in self.brands if brand.lower() not in by_name]
+        if unknown:
+            raise ValueError(f"Unknown brands {unknown}, the model detects: {sorted(names.values())}")
+        return sorted(by_name[brand.lower()] for brand in self.brands)
+
+    def model_kwargs(self, names: Dict[int, str]) -> Dict:
+        """Keyword arguments for the ultralytics model call"""
+        return {
+            'imgsz': self.imgsz,
+            'conf': self.conf,
+            'max_det': self.max_det,
+            'classes': self.class_ids(names)
+        }
+
+    def to_dict(self) -> Dict:
+        """Resolved settings as stored on the files row"""
+        return {
+            'name': self.name,
+            'imgsz': self.imgsz,
+            'conf': self.conf,
+            'max_det': self.max_det,
+            'brands': self.brands
+        }
+
+def parse_profile(spec: Optional[str]) -> InferenceProfile:
+    """
+    Resolve a profile spec: an optional profile name and/or a brands filter, separated by ";"
+    Raises ValueError for unknown profile names or malformed specs
+    """
+    name = DEFAULT_INFERENCE_PROFILE
+    brands = None
+    for part in (spec or "").split(";"):
+        part = part.strip()
+        if not part:
+            continue
+        if part.startswith("brands="):
+            value = part[len("brands="):].strip().strip("[]")
+            brands = [b.strip().strip("'\"") for b in value.split(",") if b.strip().strip("'\"")]
+            if not brands:
+                raise ValueError("Empty brands filter")
+        elif part in INFERENCE_PROFILES:
+            name = part
+        else:
+            raise ValueError(f"Unknown inference profile {part}, available: {sorted(INFERENCE_PROFILES)}")
+
+    settings = INFERENCE_PROFILES[name]
+    return InferenceProfile(name, settings['imgsz'], settings['conf'], settings['max_det'], brands)
+
+# Profile used when a request does not select one
+default_profile = parse_profile(None)
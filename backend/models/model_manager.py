@@ -0,0 +1,219 @@
+import os
+import time
+import hashlib
+import threading
+import logging
+import importlib.util
+from typing import Dict, Optional
+
+import numpy as np
+from ultralytics import YOLO
+
+from backend.models.quantization import QUANTIZATION_MODES, quantized_model_path, quantize_model
+from backend.core.config import (
+    MODEL_PATH, MODEL_FALLBACK_PATH, MODEL_ALLOW_DOWNLOAD_FALLBACK, MODEL_WARMUP_RUNS, MODEL_INPUT_SIZE,
+    INFERENCE_BACKEND, MODEL_QUANTIZATION
+)
+
+logger = logging.getLogger(__name__)
+
+# Exported backends: (ultralytics export format, runtime module it needs, suffix of the export next to the .pt)
+EXPORT_BACKENDS = {
+    'onnx': ('onnx', 'onnxruntime', '.onnx'),
+    'openvino': ('openvino', 'openvino', '_openvino_model')
+}
+
+def exported_model_path(weights_path: str, backend: str) -> str:
+    """Where the export of weights_path for backend is cached (best.pt -> best.onnx, best_openvino_model/)"""
+    return os.path.splitext(weights_path)[0] + EXPORT_BACKENDS[backend][2]
+
+def _is_stale(path: str, source_path: str) -> bool:
+    return not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(source_path)
+
+class ModelManager:
+    """
+    Owns the YOLO model: loads it on first use (or when load() is called at startup)
+    and runs warm-up inferences so the first real request doesn't pay for initialization
+    A failed load is not retried implicitly; call load() again to retry.
+    """
+
+    def __init__(self, model_path: str = MODEL_PATH, fallback_path: str = MODEL_FALLBACK_PATH,
+                 allow_download_fallback: bool = MODEL_ALLOW_DOWNLOAD_FALLBACK,
+                 warmup_runs: int = MODEL_WARMUP_RUNS, warmup_size: int = MODEL_INPUT_SIZE,
+                 backend: str = INFERENCE_BACKEND, quantization: str = MODEL_QUANTIZATION):
+        self.model_path = model_path
+        self.quantization = quantization if quantization in QUANTIZATION_MODES else None
+        # INT8 models are ONNX graphs run by ONNX Runtime
+        self.backend = "onnx" if self.quantization else backend
+        self.fallback_path = fallback_path
+        self.allow_download_fallback = allow_download_fallback
+        self.warmup_runs = max(0, warmup_runs)
+        self.warmup_size = warmup_size
+        self.model = None
+        self.loaded_path = None
+        self.active_backend = None
+        self.model_version = None
+        self.state = "not_loaded"  # not_loaded, loading, ready or failed
+        self.error = None
+        self.load_seconds = None
+        self.warmup_seconds = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self.model is not None
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    def get_model(self) -> Optional[YOLO]:
+        """Return the model, loading it first if this is the first use"""
+        if self.state in ("ready", "failed"):
+            return self.model
+        with self._lock:
+            if self.state not in ("ready", "failed"):
+                self._load()
+        return self.model
+
+    def load(self) -> Optional[YOLO]:
+        """Load (or retry loading) the model and warm it up"""
+        with self._lock:
+            if self.state != "ready":
+                self._load()
+        return self.model
+
+    def _load(self):
+        self.state = "loading"
+        self.error = None
+        start = time.perf_counter()
+        try:
+            # Set environment variable to allow loading older models
+            os.environ['TORCH_WEIGHTS_ONLY'] = 'False'
+            self.model = self._load_backend(self._load_weights())
+            self.model_version = self._fingerprint(self.loaded_path)
+            self.load_seconds = round(time.perf_counter() - start, 3)
+
+            start = time.perf_counter()
+            self._warmup()
+            self.warmup_seconds = round(time.perf_counter() - start, 3)
+
+            self.state = "ready"
+            logger.info(
+                f"YOLO model {self.loaded_path} ready on {self.active_backend} (load {self.load_seconds}s, "
+                f"warm-up {self.warmup_seconds}s over {self.warmup_runs} runs)"
+            )
+        except Exception as e:
+            logger.error(f"Failed to load any YOLO model: {e}")
+            self.model = None
+            self.loaded_path = None
+            self.active_backend = None
+            self.model_version = None
+            self.error = str(e)
+            self.state = "failed"
+
+    def _load_weights(self) -> YOLO:
+        try:
+            model = YOLO(self.model_path)
+            self.loaded_path = self.model_path
+            logger.info(f"YOLO model loaded successfully from {self.model_path}")
+            return model
+        except Exception as e:
+            logger.error(f"Error loading YOLO model: {e}")
+            # Only local fallback weights unless downloads are explicitly allowed
+            if not self.allow_download_fallback and not os.path.exists(self.fallback_path):
+                raise Exception(
+                    f"Could not load {self.model_path} and fallback {self.fallback_path} is not available "
+                    f"(set MODEL_ALLOW_DOWNLOAD_FALLBACK=true to download it)"
+                )
+            logger.warning(f"Loading fallback model {self.fallback_path}...")
+            model = YOLO(self.fallback_path)  # Downloads if not exists
+            self.loaded_path = self.fallback_path
+            logger.info(f"{self.fallback_path} loaded as fallback")
+            return model
+
+    def _load_backend(self, model: YOLO) -> YOLO:
+        """
+        Swap the PyTorch model for its export to the configured backend
+        The export is cached next to the weights and redone when the weights are newer.
+        Falls back to PyTorch when the backend's runtime is not installed or the export fails.
+        """
+        self.active_backend = "pytorch"
+        if self.backend == "pytorch":
+            return model
+        if self.backend not in EXPORT_BACKENDS:
+            logger.warning(f"Unknown inference backend {self.backend}, using pytorch")
+            return model
+
+        export_format, runtime, _ = EXPORT_BACKENDS[self.backend]
+        if importlib.util.find_spec(runtime) is None:
+            logger.warning(f"{runtime} is not installed, using pytorch instead of {self.backend}")
+            return model
+
+        weights_path = self.loaded_path
+        export_path = exported_model_path(weights_path, self.backend)
+        try:
+            if _is_stale(export_path, weights_path):
+                logger.info(f"Exporting {weights_path} to {self.backend}...")
+                # Dynamic shapes so batched inference and letterboxed inputs of any size work
+                export_path = model.export(format=export_format, imgsz=MODEL_INPUT_SIZE, dynamic=True)
+            exported = YOLO(export_path, task='detect')
+        except Exception as e:
+            logger.error(f"Error loading {self.backend} export of {weights_path}, using pytorch: {e}")
+            return model
+
+        self.loaded_path = str(export_path)
+        self.active_backend = self.backend
+        if self.quantization:
+            exported = self._load_quantized(exported)
+        return exported
+
+    def _load_quantized(self, model: YOLO) -> YOLO:
+        """INT8 copy of the ONNX model, quantized on first use and cached; FP32 ONNX if that fails"""
+        onnx_path = self.loaded_path
+        quantized_path = quantized_model_path(onnx_path, self.quantization)
+        try:
+            if _is_stale(quantized_path, onnx_path):
+                quantized_path = quantize_model(onnx_path, self.quantization)
+            quantized = YOLO(quantized_path, task='detect')
+        except Exception as e:
+            logger.error(f"Error loading INT8 ({self.quantization}) model, using FP32 {onnx_path}: {e}")
+            return model
+
+        self.loaded_path = quantized_path
+        self.active_backend = f"onnx-int8-{self.quantization}"
+        return quantized
+
+    def _fingerprint(self, path: str) -> str:
+        """Content hash of the loaded model file (or export directory), used to version cached results"""
+        digest = hashlib.blake2b(digest_size=12)
+        paths = [path] if os.path.isfile(path) else sorted(
+            os.path.join(root, name) for root, _, names in os.walk(path) for name in names
+        )
+        for file_path in paths:
+            with open(file_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(chunk)
+        return f"{self.active_backend}:{digest.hexdigest()}"
+
+    def _warmup(self):
+        """Run blank images through the model to initialize weights, kernels and the predictor"""
+        blank = np.zeros((self.warmup_size, self.warmup_size, 3), dtype=np.uint8)
+        for _ in range(self.warmup_runs):
+            self.model(blank, verbose=False)
+
+    def status(self) -> Dict:
+        return {
+            'state': self.state,
+            'model_path': self.loaded_path or self.model_path,
+            'backend': self.active_backend or self.backend,
+            'quantization': self.quantization,
+            'model_version': self.model_version,
+            'load_seconds': self.load_seconds,
+            'warmup_seconds': self.warmup_seconds,
+            'warmup_runs': self.warmup_runs,
+            'error': self.error
+        }
+
+# Global instance
+model_manager = ModelManager()
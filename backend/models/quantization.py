@@ -0,0 +1,99 @@
+import os
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from backend.core.video_processor import letterbox
+from backend.core.config import (
+    MODEL_INPUT_SIZE, QUANTIZATION_CALIBRATION_DIR, QUANTIZATION_CALIBRATION_SIZE
+)
+
+logger = logging.getLogger(__name__)
+
+QUANTIZATION_MODES = ("dynamic", "static")
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+def quantized_model_path(onnx_path: str, mode: str) -> str:
+    """Where the INT8 copy of an ONNX model is cached (best.onnx -> best_int8_static.onnx)"""
+    return f"{os.path.splitext(onnx_path)[0]}_int8_{mode}.onnx"
+
+def list_calibration_images(calibration_dir: str, limit: int = QUANTIZATION_CALIBRATION_SIZE) -> List[str]:
+    """Up to limit image paths from calibration_dir, spread evenly over the sorted listing"""
+    paths = sorted(
+        str(path) for path in Path(calibration_dir).rglob("*") if path.suffix.lower() in IMAGE_EXTENSIONS
+    )
+    if len(paths) > limit > 0:
+        paths = [paths[int(i)] for i in np.linspace(0, len(paths) - 1, limit)]
+    return paths
+
+class FrameCalibrationReader:
+    """
+    Calibration data for static quantization: our own frames, preprocessed like the
+    ONNX model input (square letterbox, RGB, NCHW float32 in 0-1)
+    """
+
+    def __init__(self, image_paths: List[str], input_name: str, size: int = MODEL_INPUT_SIZE):
+        self.image_paths = image_paths
+        self.input_name = input_name
+        self.size = size
+        self._index = 0
+
+    def get_next(self) -> Optional[Dict[str, np.ndarray]]:
+        while self._index < len(self.image_paths):
+            path = self.image_paths[self._index]
+            self._index += 1
+            frame = cv2.imread(path)
+            if frame is None:
+                logger.warning(f"Skipping unreadable calibration image {path}")
+                continue
+            # stride=size pads the short side up to size, matching the fixed square input
+            image, _ = letterbox(frame, self.size, stride=self.size)
+            tensor = image[:, :, ::-1].transpose(2, 0, 1)[None].astype(np.float32) / 255.0
+            return {self.input_name: np.ascontiguousarray(tensor)}
+        return None
+
+    def rewind(self):
+        self._index = 0
+
+def quantize_model(onnx_path: str, mode: str, calibration_dir: str = QUANTIZATION_CALIBRATION_DIR) -> str:
+    """
+    Write an INT8 copy of an ONNX model and return its path
+    dynamic: weights quantized ahead of time, activations at run time (no calibration data)
+    static: activations quantized with ranges calibrated on the frames in calibration_dir
+    """
+    if mode not in QUANTIZATION_MODES:
+        raise Exception(f"Unknown quantization mode {mode}, expected one of {QUANTIZATION_MODES}")
+
+    # Optional dependency, only needed when quantization is enabled
+    import onnx
+    from onnxruntime.quantization import QuantFormat, QuantType, quantize_dynamic, quantize_static
+
+    output_path = quantized_model_path(onnx_path, mode)
+    logger.info(f"Quantizing {onnx_path} to INT8 ({mode})...")
+
+    if mode == "dynamic":
+        quantize_dynamic(onnx_path, output_path, weight_type=QuantType.QUInt8)
+    else:
+        image_paths = list_calibration_images(calibration_dir)
+        if not image_paths:
+            raise Exception(f"No calibration images found in {calibration_dir}")
+        input_name = onnx.load(onnx_path, load_external_data=False).graph.input[0].name
+        logger.info(f"Calibrating on {len(image_paths)} frames from {calibration_dir}")
+        quantize_static(
+            onnx_path, output_path, FrameCalibrationReader(image_paths, input_name),
+            quant_format=QuantFormat.QDQ, activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8, per_channel=True
+        )
+
+    # ultralytics reads class names, stride and imgsz from the model metadata
+    source = onnx.load(onnx_path, load_external_data=False)
+    quantized = onnx.load(output_path)
+    del quantized.metadata_props[:]
+    quantized.metadata_props.extend(source.metadata_props)
+    onnx.save(quantized, output_path)
+
+    logger.info(f"Quantized model written to {output_path}")
+    return output_path
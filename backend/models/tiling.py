@@ -0,0 +1,70 @@
+import logging
+from typing import List, Tuple
+
+import numpy as np
+
+from backend.core.config import TILE_SIZE, TILE_OVERLAP, TILE_MERGE_THRESHOLD
+
+logger = logging.getLogger(__name__)
+
+def tile_origins(length: int, tile_size: int, overlap: float) -> List[int]:
+    """Start offsets of overlapping tiles along one axis; the last tile ends at the edge"""
+    if length <= tile_size:
+        return [0]
+    step = max(1, int(tile_size * (1 - overlap)))
+    origins = list(range(0, length - tile_size, step))
+    origins.append(length - tile_size)
+    return origins
+
+def make_tiles(frame: np.ndarray, tile_size: int = TILE_SIZE,
+               overlap: float = TILE_OVERLAP) -> Tuple[List[np.ndarray], List[Tuple[int, int]]]:
+    """
+    Slice a frame into overlapping tiles (views, no copies)
+    Returns the tiles and the (x, y) offset of each one in the frame
+    """
+    h, w = frame.shape[:2]
+    tiles, offsets = [], []
+    for y in tile_origins(h, tile_size, overlap):
+        for x in tile_origins(w, tile_size, overlap):
+            tiles.append(frame[y:y + tile_size, x:x + tile_size])
+            offsets.append((x, y))
+    return tiles, offsets
+
+def merge_nms(boxes: np.ndarray, scores: np.ndarray, class_ids: np.ndarray,
+              threshold: float = TILE_MERGE_THRESHOLD) -> np.ndarray:
+    """
+    Class-aware greedy NMS across tiles; returns the indices to keep, best score first
+    Overlap is measured as intersection over the smaller box, so a logo cut by a tile
+    edge is suppressed by the complete box from the neighbouring tile or the full frame
+    """
+    order = np.argsort(-scores)
+    areas = np.clip(boxes[:, 2] - boxes[:, 0], 0, None) * np.clip(boxes[:, 3] - boxes[:, 1], 0, None)
+    keep = []
+    while len(order):
+        best, rest = order[0], order[1:]
+        keep.append(best)
+        ix1 = np.maximum(boxes[best, 0], boxes[rest, 0])
+        iy1 = np.maximum(boxes[best, 1], boxes[rest, 1])
+        ix2 = np.minimum(boxes[best, 2], boxes[rest, 2])
+        iy2 = np.minimum(boxes[best, 3], boxes[rest, 3])
+        intersection = np.clip(ix2 - ix1, 0, None) * np.clip(iy2 - iy1, 0, None)
+        smaller = np.maximum(np.minimum(areas[best], areas[rest]), 1e-9)
+        duplicate = (class_ids[rest] == class_ids[best]) & (intersection / smaller > threshold)
+        order = rest[~duplicate]
+    return np.array(keep, dtype=np.int64)
+
+def merge_tile_detections(tile_boxes: List[np.ndarray], tile_scores: List[np.ndarray],
+                          tile_class_ids: List[np.ndarray], offsets: List[Tuple[int, int]],
+                          threshold: float = TILE_MERGE_THRESHOLD) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Shift per-tile boxes into frame coordinates and merge duplicates; returns (boxes, scores, class_ids)"""
+    shifted = [
+        boxes + np.array([x, y, x, y], dtype=boxes.dtype)
+        for boxes, (x, y) in zip(tile_boxes, offsets)
+    ]
+    boxes = np.concatenate(shifted) if shifted else np.zeros((0, 4), dtype=np.float32)
+    scores = np.concatenate(tile_scores) if tile_scores else np.zeros(0, dtype=np.float32)
+    class_ids = np.concatenate(tile_class_ids) if tile_class_ids else np.zeros(0, dtype=np.int64)
+    if len(scores) == 0:
+        return boxes, scores, class_ids
+    keep = merge_nms(boxes, scores, class_ids, threshold)
+    return boxes[keep], scores[keep], class_ids[keep]
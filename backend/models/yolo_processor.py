@@ -1,69 +1,279 @@
-from ultralytics import YOLO
 import cv2
 import numpy as np
-import torch
-import os
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Sequence
 import logging
-from backend.core.config import MODEL_PATH, CONFIDENCE_THRESHOLD
+from backend.core.config import (
+    INFERENCE_BATCH_SIZE, TILED_INFERENCE, TILING_MIN_SIDE,
+    TILE_SIZE, TILE_OVERLAP, TILE_MERGE_THRESHOLD, CASCADE_ENABLED, CASCADE_SCREEN_MODEL,
+    CASCADE_SCREEN_SIZE, CASCADE_SCREEN_THRESHOLD, CASCADE_AUDIT_RATE
+)
+from backend.core.result_cache import ResultCache, result_cache
+from backend.models.model_manager import ModelManager, model_manager
+from backend.models.tiling import make_tiles, merge_tile_detections
+from backend.models.cascade import PASSED, REJECTED, AUDITED
+from backend.models.inference_profiles import InferenceProfile, default_profile
 
 logger = logging.getLogger(__name__)
 
+class DetectionResult(Sequence):
+    """
+    Detections of one image in columnar form
+    boxes (N, 4 xyxy), scores (N,) and class_ids (N,) are NumPy arrays. It behaves like the
+    list of detection dicts it replaces, but a dict is only built when an item is accessed
+    and is kept afterwards, so callers can still annotate detections in place.
+    """
+    
+    def __init__(self, boxes: np.ndarray, scores: np.ndarray, class_ids: np.ndarray, names: Dict):
+        self.boxes = boxes
+        self.scores = scores
+        self.class_ids = class_ids
+        self.names = names
+        self.failed = False  # Inference error; the empty result must not be cached
+        self.cascade = None  # Screening outcome when the cascade ran on this frame
+        self._dicts = None
+    
+    @classmethod
+    def empty(cls, names: Dict) -> 'DetectionResult':
+        return cls(np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.float32),
+                   np.zeros(0, dtype=np.int64), names)
+    
+    @classmethod
+    def from_ultralytics(cls, result, names: Dict) -> 'DetectionResult':
+        """Copy the box tensors of an ultralytics result to NumPy, one transfer per column"""
+        boxes = result.boxes
+        if boxes is None or len(boxes) == 0:
+            return cls.empty(names)
+        return cls(
+            boxes.xyxy.cpu().numpy(),
+            boxes.conf.cpu().numpy(),
+            boxes.cls.cpu().numpy().astype(np.int64),
+            names
+        )
+    
+    def __len__(self) -> int:
+        return len(self.scores)
+    
+    def __getitem__(self, index):
+        return self.to_dicts()[index]
+    
+    def __iter__(self):
+        return iter(self.to_dicts())
+    
+    def __getstate__(self):
+        # Only the arrays cross process boundaries, dicts are rebuilt on demand
+        state = self.__dict__.copy()
+        state['_dicts'] = None
+        return state
+    
+    def to_dicts(self) -> List[Dict]:
+        """Detection dicts with bbox, confidence, class_id and class_name (built once)"""
+        if self._dicts is None:
+            self._dicts = [
+                {
+                    'bbox': bbox,
+                    'confidence': confidence,
+                    'class_id': class_id,
+                    'class_name': self.names[class_id]
+                }
+                for bbox, confidence, class_id in zip(
+                    self.boxes.tolist(), self.scores.tolist(), self.class_ids.tolist()
+                )
+            ]
+        return self._dicts
+    
+    def rescale(self, params: Tuple[float, int, int], original_shape: Tuple[int, int]) -> 'DetectionResult':
+        """Map boxes from letterboxed coordinates back to the original frame (in place)"""
+        if len(self) == 0:
+            return self
+        scale, pad_x, pad_y = params
+        h, w = original_shape[:2]
+        boxes = (self.boxes - np.array([pad_x, pad_y, pad_x, pad_y], dtype=np.float32)) / scale
+        self.boxes = np.clip(boxes, 0, np.array([w, h, w, h], dtype=np.float32))
+        self._dicts = None
+        return self
+
 class YOLOProcessor:
-    def __init__(self):
-        try:
-            # Set environment variable to allow loading older models
-            os.environ['TORCH_WEIGHTS_ONLY'] = 'False'
-            
-            # Try to load the model
-            self.model = YOLO(MODEL_PATH)
-            logger.info(f"YOLO model loaded successfully from {MODEL_PATH}")
-        except Exception as e:
-            logger.error(f"Error loading YOLO model: {e}")
-            # Create a dummy model for development/testing
-            try:
-                logger.warning("Creating a YOLOv8n model for testing purposes...")
-                self.model = YOLO('yolov8n.pt')  # This will download if not exists
-                logger.info("YOLOv8n model loaded as fallback")
-            except Exception as e2:
-                logger.error(f"Failed to load any YOLO model: {e2}")
-                self.model = None
-    
-    def detect_objects(self, image: np.ndarray) -> List[Dict]:
+    def __init__(self, manager: ModelManager = model_manager, tiled: bool = TILED_INFERENCE,
+                 tiling_min_side: int = TILING_MIN_SIDE, cache: ResultCache = result_cache,
+                 cascade: bool = CASCADE_ENABLED, screen_model_path: str = CASCADE_SCREEN_MODEL):
+        self.manager = manager
+        self.tiled = tiled
+        self.tiling_min_side = tiling_min_side
+        self.cache = cache
+        self.cascade = cascade
+        # Without a dedicated screening model the main model screens at low resolution
+        self.screen_manager = ModelManager(
+            model_path=screen_model_path, fallback_path=screen_model_path, quantization="none"
+        ) if cascade and screen_model_path else None
+        self.audit_interval = max(1, round(1 / CASCADE_AUDIT_RATE)) if CASCADE_AUDIT_RATE > 0 else 0
+        self._rejected_seen = 0
+    
+    @property
+    def model(self):
+        """The YOLO model, loaded by the model manager on first use"""
+        return self.manager.get_model()
+    
+    def detect_objects(self, image: np.ndarray, profile: InferenceProfile = None) -> DetectionResult:
         """
         Detect objects in image using YOLO model
-        Returns list of detections with bbox, confidence, and class
+        Returns a DetectionResult (a sequence of dicts with bbox, confidence, and class)
         """
         try:
-            if self.model is None:
-                logger.warning("YOLO model not loaded, returning empty detections")
-                return []
-                
-            results = self.model(image, conf=CONFIDENCE_THRESHOLD)
-            detections = []
-            
-            for result in results:
-                boxes = result.boxes
-                if boxes is not None:
-                    for box in boxes:
-                        # Get box coordinates
-                        x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                        confidence = float(box.conf[0].cpu().numpy())
-                        class_id = int(box.cls[0].cpu().numpy())
-                        class_name = self.model.names[class_id]
-                        
-                        detection = {
-                            'bbox': [float(x1), float(y1), float(x2), float(y2)],
-                            'confidence': confidence,
-                            'class_id': class_id,
-                            'class_name': class_name
-                        }
-                        detections.append(detection)
-            
-            return detections
+            return self.detect_batch([image], 1, profile)[0]
         except Exception as e:
             logger.error(f"Error in object detection: {e}")
-            return []
+            return DetectionResult.empty({})
+    
+    def detect_batch(self, frames: List[np.ndarray], batch_size: int = INFERENCE_BATCH_SIZE,
+                     profile: InferenceProfile = None) -> List[DetectionResult]:
+        """
+        Detect objects in several images, running the model on batch_size images per call
+        Returns one list of detections per input frame, in the same order as frames
+        profile sets imgsz, conf, class filter and max_det (default profile when None)
+        Frames seen before with the same model and settings come from the result cache
+        """
+        profile = profile or default_profile
+        if self.model is None:
+            logger.warning("YOLO model not loaded, returning empty detections")
+            return [DetectionResult.empty({}) for _ in frames]
+        if not self.cache.enabled:
+            return self._detect_uncached(frames, batch_size, profile)
+        
+        context = self._cache_context(profile)
+        keys = [self.cache.key(frame, context) for frame in frames]
+        batch_detections = []
+        misses = []
+        for i, key in enumerate(keys):
+            cached = self.cache.get(key)
+            if cached is None:
+                misses.append(i)
+                batch_detections.append(None)
+            else:
+                batch_detections.append(DetectionResult(*cached, self.model.names))
+        
+        if misses:
+            computed = self._detect_uncached([frames[i] for i in misses], batch_size, profile)
+            for i, detections in zip(misses, computed):
+                if not detections.failed:
+                    self.cache.put(keys[i], (detections.boxes, detections.scores, detections.class_ids))
+                batch_detections[i] = detections
+        return batch_detections
+    
+    def _cache_context(self, profile: InferenceProfile) -> str:
+        """Everything besides the pixels that changes the detections"""
+        tiling = f"{self.tiling_min_side}/{TILE_SIZE}/{TILE_OVERLAP}/{TILE_MERGE_THRESHOLD}" if self.tiled else "off"
+        cascade = "off"
+        if self.cascade:
+            screen = CASCADE_SCREEN_SIZE
+            if self.screen_manager is not None and self.screen_manager.get_model() is not None:
+                screen = self.screen_manager.model_version
+            cascade = f"{screen}/{CASCADE_SCREEN_THRESHOLD}"
+        return f"{self.manager.model_version}|{profile.key}|tiling={tiling}|cascade={cascade}"
+    
+    def _detect_uncached(self, frames: List[np.ndarray], batch_size: int,
+                         profile: InferenceProfile) -> List[DetectionResult]:
+        """
+        Run the model on frames; high-resolution frames go tile by tile when tiled inference is enabled
+        With the cascade, frames the screening pass rejects skip the full model (tiled frames are not screened)
+        """
+        batch_size = max(1, batch_size)
+        batch_detections = [None] * len(frames)
+        
+        plain = [i for i, frame in enumerate(frames) if not self._needs_tiling(frame)]
+        outcomes = {}
+        if self.cascade and plain:
+            outcomes = self._screen(frames, plain, batch_size, profile)
+            for i, outcome in outcomes.items():
+                if outcome == REJECTED:
+                    batch_detections[i] = DetectionResult.empty(self.model.names)
+                    batch_detections[i].cascade = REJECTED
+            plain = [i for i in plain if outcomes[i] != REJECTED]
+        
+        for start in range(0, len(plain), batch_size):
+            chunk = plain[start:start + batch_size]
+            for i, detections in zip(chunk, self._run_model([frames[i] for i in chunk], profile)):
+                detections.cascade = outcomes.get(i)
+                batch_detections[i] = detections
+        
+        for i, frame in enumerate(frames):
+            if batch_detections[i] is None:
+                batch_detections[i] = self._detect_tiled(frame, profile)
+        
+        return batch_detections
+    
+    def _run_model(self, images: List[np.ndarray], profile: InferenceProfile) -> List[DetectionResult]:
+        """One model call over images"""
+        # Outside the try: an invalid profile (unknown brands) fails the job instead of looking like empty frames
+        kwargs = profile.model_kwargs(self.model.names)
+        try:
+            results = self.model(images, verbose=False, **kwargs)
+            return [self._parse_result(result) for result in results]
+        except Exception as e:
+            logger.error(f"Error in batched object detection: {e}")
+            failed = [DetectionResult.empty(self.model.names) for _ in images]
+            for detections in failed:
+                detections.failed = True
+            return failed
+    
+    def _screen(self, frames: List[np.ndarray], indices: List[int], batch_size: int,
+                profile: InferenceProfile) -> Dict[int, str]:
+        """
+        Cheap screening pass over frames[indices]; returns each frame's outcome
+        Every audit_interval-th rejected frame is marked for a full-model audit instead
+        """
+        outcomes = {}
+        for start in range(0, len(indices), batch_size):
+            chunk = indices[start:start + batch_size]
+            for i, has_candidate in zip(chunk, self._run_screen([frames[i] for i in chunk], profile)):
+                if has_candidate:
+                    outcomes[i] = PASSED
+                    continue
+                self._rejected_seen += 1
+                audit = self.audit_interval and self._rejected_seen % self.audit_interval == 0
+                outcomes[i] = AUDITED if audit else REJECTED
+        return outcomes
+    
+    def _run_screen(self, images: List[np.ndarray], profile: InferenceProfile) -> List[bool]:
+        """Whether the screening pass finds any candidate box in each image; on errors every image passes"""
+        try:
+            if self.screen_manager is not None:
+                model = self.screen_manager.get_model()
+                options = {}
+            else:
+                model = self.model
+                # Same model: screen only for the classes the profile keeps
+                options = {'imgsz': CASCADE_SCREEN_SIZE, 'classes': profile.class_ids(model.names)}
+            if model is None:
+                return [True] * len(images)
+            results = model(images, conf=CASCADE_SCREEN_THRESHOLD, max_det=1, verbose=False, **options)
+            return [result.boxes is not None and len(result.boxes) > 0 for result in results]
+        except Exception as e:
+            logger.error(f"Error in cascade screening, sending frames to the full model: {e}")
+            return [True] * len(images)
+    
+    def _needs_tiling(self, frame: np.ndarray) -> bool:
+        return self.tiled and max(frame.shape[:2]) > self.tiling_min_side
+    
+    def _detect_tiled(self, frame: np.ndarray, profile: InferenceProfile) -> DetectionResult:
+        """
+        Detect on overlapping full-resolution tiles plus the whole (downscaled) frame in one batch
+        The whole-frame pass keeps logos larger than a tile; boxes are merged with cross-tile NMS
+        """
+        tiles, offsets = make_tiles(frame)
+        results = self._run_model([frame] + tiles, profile)
+        boxes, scores, class_ids = merge_tile_detections(
+            [r.boxes for r in results], [r.scores for r in results], [r.class_ids for r in results],
+            [(0, 0)] + offsets
+        )
+        # Merged boxes come best first, so max_det applies to the whole frame
+        keep = slice(0, profile.max_det)
+        merged = DetectionResult(boxes[keep], scores[keep], class_ids[keep], self.model.names)
+        merged.failed = any(r.failed for r in results)
+        return merged
+    
+    def _parse_result(self, result) -> DetectionResult:
+        """Convert one ultralytics result into a columnar DetectionResult"""
+        return DetectionResult.from_ultralytics(result, self.model.names)
     
     def crop_detection(self, image: np.ndarray, bbox: List[float], padding: int = 10) -> np.ndarray:
         """
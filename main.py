@@ -1,4 +1,5 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException, BackgroundTasks
+import asyncio
+from fastapi import FastAPI, File, Form, UploadFile, HTTPException, BackgroundTasks
 from fastapi.responses import JSONResponse
 import os
 import tempfile
@@ -10,15 +11,22 @@ import uuid
 
 # Local imports
 from backend.database.supabase_client import supabase_client
-from backend.models.yolo_processor import yolo_processor
+from backend.models.model_manager import model_manager
+from backend.models.inference_profiles import InferenceProfile, parse_profile
 from backend.core.processing_service import processing_service
 from backend.core.video_processor import video_processor
 from backend.core.stats_calculator import stats_calculator
+from backend.core.segment_processor import segment_processor
+from backend.core.result_cache import result_cache
+from backend.core.inference_scheduler import inference_scheduler
+from backend.core.upload_manager import upload_manager
+from backend.core.threading_config import apply_thread_settings
 from backend.api.endpoints import router as api_router
 from backend.core.config import (
-    UPLOAD_DIR, FRAMES_DIR, CROPS_DIR, 
+    UPLOAD_DIR,
     SUPPORTED_VIDEO_FORMATS, SUPPORTED_IMAGE_FORMATS,
-    MAX_FILE_SIZE, TARGET_FPS, SUPABASE_IMAGES_BUCKET, SUPABASE_VIDEOS_BUCKET
+    MAX_FILE_SIZE, TARGET_FPS, SUPABASE_IMAGES_BUCKET, SUPABASE_VIDEOS_BUCKET,
+    MODEL_LOAD_ON_STARTUP
 )
 
 # Configure logging
@@ -33,21 +41,90 @@ app.include_router(api_router)
 
 # Create directories
 os.makedirs(UPLOAD_DIR, exist_ok=True)
-os.makedirs(FRAMES_DIR, exist_ok=True)
-os.makedirs(CROPS_DIR, exist_ok=True)
 
 # Global cache for processing results
 processing_results = {}
 
+@app.on_event("startup")
+async def load_model():
+    """Apply thread/affinity settings, then load and warm up the model in the background; /ready reports when it is done"""
+    apply_thread_settings()
+    if MODEL_LOAD_ON_STARTUP:
+        asyncio.get_running_loop().run_in_executor(None, model_manager.load)
+
+@app.on_event("startup")
+async def load_brands():
+    """Preload the brand name -> id cache so detections don't look brands up one by one"""
+    try:
+        await supabase_client.load_brands()
+    except Exception as e:
+        logger.warning(f"Could not preload brands, they will be resolved on demand: {e}")
+
+@app.on_event("shutdown")
+async def shutdown_workers():
+    """Stop the segment worker processes, the inference scheduler and the Supabase I/O threads"""
+    segment_processor.shutdown()
+    inference_scheduler.shutdown()
+    supabase_client.shutdown()
+
 @app.get("/")
 async def root():
     return {"message": "Logo Detection API is running"}
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "model_loaded": yolo_processor.model is not None}
+    return {"status": "healthy", "model_loaded": model_manager.loaded}
+
+@app.get("/ready")
+async def readiness_check():
+    """Ready once the model is loaded and warmed up"""
+    status = model_manager.status()
+    if not model_manager.ready:
+        return JSONResponse(content={"status": "not_ready", "model": status}, status_code=503)
+    return {"status": "ready", "model": status}
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Hit/miss counters of the detection result cache (this process only)"""
+    return result_cache.stats()
+
+@app.get("/uploads/stats")
+async def upload_stats():
+    """Storage upload counters and latencies (this process only)"""
+    return upload_manager.stats()
+
+@app.get("/scheduler/stats")
+async def scheduler_stats():
+    """Batching counters of the inference scheduler"""
+    return inference_scheduler.stats()
 
-async def process_media_file(file_path: str, original_filename: str, file_type: str, session_id: str):
+def save_upload(file: UploadFile, path: str):
+    """Copy an uploaded file to disk (blocking, run in an executor)"""
+    with open(path, "wb") as buffer:
+        shutil.copyfileobj(file.file, buffer)
+
+async def resolve_profile(spec: Optional[str]) -> InferenceProfile:
+    """
+    Parse the profile form field, rejecting unknown profiles and brands with a 400
+    A brands filter is checked against the model's classes, so the request waits (off the
+    event loop) for the model if it is still loading or not loaded yet
+    """
+    try:
+        profile = parse_profile(spec)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if profile.brands:
+        model = await asyncio.get_running_loop().run_in_executor(None, model_manager.get_model)
+        if model is None:
+            raise HTTPException(status_code=503, detail="Model not available, brands cannot be checked")
+        try:
+            profile.class_ids(model.names)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    return profile
+
+async def process_media_file(file_path: str, original_filename: str, file_type: str, session_id: str,
+                             profile: InferenceProfile = None):
     """Background task to process uploaded media file"""
     try:
         logger.info(f"Starting processing of {original_filename} with session {session_id}")
@@ -58,10 +135,10 @@ async def process_media_file(file_path: str, original_filename: str, file_type:
         
         if is_video:
             # Process video
-            result = await processing_service.process_video(file_path, original_filename, session_id)
+            result = await processing_service.process_video(file_path, original_filename, session_id, profile)
         else:
             # Process image
-            result = await processing_service.process_image(file_path, original_filename, session_id)
+            result = await processing_service.process_image(file_path, original_filename, session_id, profile)
         
         logger.info(f"Processing completed for {original_filename} - File ID: {result.get('file_id')}")
         
@@ -77,8 +154,12 @@ async def process_media_file(file_path: str, original_filename: str, file_type:
         raise
 
 @app.post("/upload")
-async def upload_file(file: UploadFile = File(...)):
-    """Upload and process image or video file synchronously"""
+async def upload_file(file: UploadFile = File(...), profile: Optional[str] = Form(None)):
+    """
+    Upload and process image or video file synchronously
+    profile selects the inference settings, e.g. "fast", "accurate" or "brands=nike,adidas"
+    """
+    inference_profile = await resolve_profile(profile)
     try:
         # Validate file size
         if file.size > MAX_FILE_SIZE:
@@ -99,8 +180,7 @@ async def upload_file(file: UploadFile = File(...)):
         
         temp_file_path = os.path.join(temp_dir, file.filename)
         
-        with open(temp_file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        await asyncio.get_running_loop().run_in_executor(None, save_upload, file, temp_file_path)
         
         # Process file SYNCHRONOUSLY (no background task)
         logger.info(f"Starting synchronous processing of {file.filename}")
@@ -110,10 +190,14 @@ async def upload_file(file: UploadFile = File(...)):
         
         if is_video:
             # Process video
-            result = await processing_service.process_video(temp_file_path, file.filename, session_id)
+            result = await processing_service.process_video(
+                temp_file_path, file.filename, session_id, inference_profile
+            )
         else:
             # Process image
-            result = await processing_service.process_image(temp_file_path, file.filename, session_id)
+            result = await processing_service.process_image(
+                temp_file_path, file.filename, session_id, inference_profile
+            )
         
         logger.info(f"Processing completed for {file.filename} - File ID: {result.get('file_id')}")
         
@@ -136,6 +220,7 @@ async def upload_file(file: UploadFile = File(...)):
                 "image_url": result.get("image_url")
             },
             "statistics": result.get("statistics"),
+            "inference_profile": inference_profile.to_dict(),
             "endpoints": {
                 "detections": f"/detections/{result.get('file_id')}",
                 "frame_captures": f"/frame-captures/{result.get('file_id')}",
@@ -185,8 +270,10 @@ async def get_processing_status(session_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/upload-async")
-async def upload_file_async(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
+async def upload_file_async(background_tasks: BackgroundTasks, file: UploadFile = File(...),
+                            profile: Optional[str] = Form(None)):
     """Upload and process image or video file asynchronously (original behavior)"""
+    inference_profile = await resolve_profile(profile)
     try:
         # Validate file size
         if file.size > MAX_FILE_SIZE:
@@ -207,8 +294,7 @@ async def upload_file_async(background_tasks: BackgroundTasks, file: UploadFile
         
         temp_file_path = os.path.join(temp_dir, file.filename)
         
-        with open(temp_file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        await asyncio.get_running_loop().run_in_executor(None, save_upload, file, temp_file_path)
         
         # Process file in background
         background_tasks.add_task(
@@ -216,7 +302,8 @@ async def upload_file_async(background_tasks: BackgroundTasks, file: UploadFile
             temp_file_path, 
             file.filename, 
             file.content_type,
-            session_id
+            session_id,
+            inference_profile
         )
         
         return JSONResponse(content={
@@ -225,6 +312,7 @@ async def upload_file_async(background_tasks: BackgroundTasks, file: UploadFile
             "filename": file.filename,
             "file_size": file.size,
             "file_type": "video" if file_extension in SUPPORTED_VIDEO_FORMATS else "image",
+            "inference_profile": inference_profile.to_dict(),
             "status_endpoint": f"/upload-result/{session_id}",
             "detailed_status_endpoint": f"/processing-status/{session_id}"
         })
@@ -281,7 +369,9 @@ async def get_file_info(file_id: int):
     """Get file information and detection summary by file_id"""
     try:
         # Get file information
-        file_response = supabase_client.client.table('files').select('*').eq('id', file_id).execute()
+        file_response = await supabase_client.execute(
+            supabase_client.client.table('files').select('*').eq('id', file_id)
+        )
         
         if not file_response.data:
             raise HTTPException(status_code=404, detail="File not found")
@@ -289,19 +379,24 @@ async def get_file_info(file_id: int):
         file_info = file_response.data[0]
         
         # Get detection count
-        detection_response = supabase_client.client.table('detections').select('id').eq('file_id', file_id).execute()
+        detection_response = await supabase_client.execute(
+            supabase_client.client.table('detections').select('id').eq('file_id', file_id)
+        )
         detections_count = len(detection_response.data)
         
         # Get brands detected
-        brands_response = supabase_client.client.table('detections') \
-            .select('brands(name)') \
-            .eq('file_id', file_id) \
-            .execute()
+        brands_response = await supabase_client.execute(
+            supabase_client.client.table('detections') \
+                .select('brands(name)') \
+                .eq('file_id', file_id)
+        )
         
         brands = list(set([d['brands']['name'] for d in brands_response.data if d['brands']]))
         
         # Get frame captures count
-        frames_response = supabase_client.client.table('frame_captures').select('id').eq('file_id', file_id).execute()
+        frames_response = await supabase_client.execute(
+            supabase_client.client.table('frame_captures').select('id').eq('file_id', file_id)
+        )
         frames_count = len(frames_response.data)
         
         return JSONResponse(content={
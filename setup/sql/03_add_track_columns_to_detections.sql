@@ -0,0 +1,30 @@
+-- Migration: Add track columns to detections table
+-- Description: With cross-frame tracking a detection row can summarise a whole track
+--              (one logo followed over consecutive sampled frames) instead of a single frame
+-- Date: 2025
+-- Author: System
+
+-- Add track columns to detections table (all nullable, per-frame rows leave them empty)
+ALTER TABLE detections ADD COLUMN IF NOT EXISTS track_id INTEGER;
+ALTER TABLE detections ADD COLUMN IF NOT EXISTS first_frame INTEGER;
+ALTER TABLE detections ADD COLUMN IF NOT EXISTS last_frame INTEGER;
+ALTER TABLE detections ADD COLUMN IF NOT EXISTS frames_count INTEGER;
+ALTER TABLE detections ADD COLUMN IF NOT EXISTS avg_score FLOAT;
+ALTER TABLE detections ADD COLUMN IF NOT EXISTS min_score FLOAT;
+
+-- Add comments for documentation
+COMMENT ON COLUMN detections.track_id IS 'Track number within the file when the row summarises a track (NULL for per-frame rows)';
+COMMENT ON COLUMN detections.first_frame IS 'First sampled frame of the track';
+COMMENT ON COLUMN detections.last_frame IS 'Last sampled frame of the track';
+COMMENT ON COLUMN detections.frames_count IS 'Number of sampled frames in which the track was detected';
+COMMENT ON COLUMN detections.avg_score IS 'Average confidence over the track (score holds the best one)';
+COMMENT ON COLUMN detections.min_score IS 'Lowest confidence over the track';
+
+-- Verify the changes
+SELECT 
+    column_name, 
+    data_type, 
+    is_nullable
+FROM information_schema.columns 
+WHERE table_name = 'detections' 
+AND column_name IN ('track_id', 'first_frame', 'last_frame', 'frames_count', 'avg_score', 'min_score');
@@ -0,0 +1,20 @@
+-- Migration: Add inference profile column to files table
+-- Description: Each upload can pick an inference profile (input size, confidence, brand filter,
+--              max detections); the resolved settings are stored with the file for reproducibility
+-- Date: 2025
+-- Author: System
+
+-- Add inference profile column to files table (nullable, older rows used the default settings)
+ALTER TABLE files ADD COLUMN IF NOT EXISTS inference_profile JSONB;
+
+-- Add comments for documentation
+COMMENT ON COLUMN files.inference_profile IS 'Resolved inference settings used for the file: name, imgsz, conf, max_det, brands';
+
+-- Verify the changes
+SELECT 
+    column_name, 
+    data_type, 
+    is_nullable
+FROM information_schema.columns 
+WHERE table_name = 'files' 
+AND column_name = 'inference_profile';
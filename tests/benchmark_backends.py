@@ -0,0 +1,71 @@
+"""
+Benchmark de backends de inferencia en CPU
+Compara la latencia de PyTorch, ONNX Runtime y OpenVINO por imagen y por lote
+"""
+
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.models.model_manager import ModelManager
+from backend.models.yolo_processor import YOLOProcessor
+from backend.core.result_cache import ResultCache
+from backend.core.config import INFERENCE_BATCH_SIZE
+
+BACKENDS = ["pytorch", "onnx", "openvino"]
+ITERATIONS = 20
+FRAME_SIZE = (1280, 720)
+
+def load_frame():
+    """Usa image.png si existe, si no un frame sintético"""
+    if os.path.exists("image.png"):
+        return cv2.resize(cv2.imread("image.png"), FRAME_SIZE)
+    rng = np.random.default_rng(0)
+    return rng.integers(0, 255, (FRAME_SIZE[1], FRAME_SIZE[0], 3), dtype=np.uint8)
+
+def time_call(function):
+    """Devuelve la mediana en milisegundos de ITERATIONS llamadas"""
+    timings = []
+    for _ in range(ITERATIONS):
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings))
+
+def main():
+    print("⚡ Benchmark de backends de inferencia")
+    print(f"   Frame {FRAME_SIZE[0]}x{FRAME_SIZE[1]}, lote de {INFERENCE_BATCH_SIZE}, mediana de {ITERATIONS} llamadas")
+
+    frame = load_frame()
+    batch = [frame] * INFERENCE_BATCH_SIZE
+
+    header = f"{'backend':>10} {'carga (s)':>10} {'imagen (ms)':>12} {'lote (ms)':>10} {'ms/frame':>9}"
+    print(header)
+    print("-" * len(header))
+
+    baseline = None
+    for backend in BACKENDS:
+        manager = ModelManager(backend=backend, warmup_runs=2, quantization="none")
+        processor = YOLOProcessor(manager, cache=ResultCache(enabled=False))
+        manager.load()
+        if manager.active_backend != backend:
+            print(f"{backend:>10} {'no disponible':>10}")
+            continue
+
+        single = time_call(lambda: processor.detect_objects(frame))
+        batched = time_call(lambda: processor.detect_batch(batch, INFERENCE_BATCH_SIZE))
+        per_frame = batched / len(batch)
+        baseline = baseline or per_frame
+        print(f"{backend:>10} {manager.load_seconds:>10.2f} {single:>12.1f} {batched:>10.1f} {per_frame:>9.1f}"
+              f"  ({baseline / per_frame:.2f}x)")
+
+    print("\n✅ Benchmark completado")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Benchmark de muestreo de frames
+Compara el tiempo de decodificación de las estrategias read/grab/seek
+según la duración del video y la tasa de muestreo
+"""
+
+import os
+import sys
+import time
+import tempfile
+
+import cv2
+import numpy as np
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.core.video_processor import video_processor
+
+VIDEO_FPS = 30
+VIDEO_SIZE = (1280, 720)
+DURATIONS_SECONDS = [10, 30, 60]
+SAMPLE_RATES = [0.1, 0.5, 1, 5]
+STRATEGIES = ["read", "grab", "seek"]
+
+def create_test_video(path, duration_seconds):
+    """Genera un video sintético con contenido que cambia en cada frame"""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), VIDEO_FPS, VIDEO_SIZE)
+    rng = np.random.default_rng(0)
+    background = rng.integers(0, 255, (VIDEO_SIZE[1], VIDEO_SIZE[0], 3), dtype=np.uint8)
+    
+    for i in range(int(duration_seconds * VIDEO_FPS)):
+        frame = np.roll(background, i * 4, axis=1)
+        cv2.putText(frame, str(i), (50, 200), cv2.FONT_HERSHEY_SIMPLEX, 4, (255, 255, 255), 8)
+        writer.write(frame)
+    
+    writer.release()
+    return path
+
+def time_strategy(video_path, target_fps, strategy):
+    """Devuelve (segundos, frames muestreados) para una estrategia"""
+    start = time.perf_counter()
+    count = sum(1 for _ in video_processor.iter_frames(video_path, target_fps, strategy=strategy))
+    return time.perf_counter() - start, count
+
+def main():
+    print("🎞️ Benchmark de muestreo de frames")
+    print(f"   Video sintético: {VIDEO_SIZE[0]}x{VIDEO_SIZE[1]} @ {VIDEO_FPS} fps")
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        header = f"{'duración':>9} {'fps obj.':>9} {'frames':>7} " + " ".join(f"{s:>9}" for s in STRATEGIES) + f" {'auto':>6}"
+        print(header)
+        print("-" * len(header))
+        
+        for duration in DURATIONS_SECONDS:
+            video_path = create_test_video(os.path.join(temp_dir, f"video_{duration}s.mp4"), duration)
+            
+            for target_fps in SAMPLE_RATES:
+                timings = []
+                count = 0
+                for strategy in STRATEGIES:
+                    elapsed, count = time_strategy(video_path, target_fps, strategy)
+                    timings.append(elapsed)
+                
+                frame_interval = max(1, int(VIDEO_FPS / target_fps))
+                auto = video_processor.choose_sampling_strategy(frame_interval, "auto")
+                print(f"{duration:>8}s {target_fps:>9} {count:>7} " + " ".join(f"{t:>8.2f}s" for t in timings) + f" {auto:>6}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark de cuantización INT8
+Compara el modelo FP32 con las versiones INT8 dinámica y estática:
+latencia en CPU y delta de mAP50 / recall por marca sobre un conjunto etiquetado
+
+Uso: python tests/benchmark_quantization.py [carpeta_etiquetada]
+La carpeta sigue el formato YOLO: images/ y labels/ con el mismo nombre de archivo
+"""
+
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.models.model_manager import ModelManager
+from backend.models.yolo_processor import YOLOProcessor
+from backend.core.result_cache import ResultCache
+from backend.models.evaluation import evaluate_detector, compare_evaluations, load_labelled_dataset
+from backend.core.config import INFERENCE_BATCH_SIZE
+
+DEFAULT_DATASET_DIR = "evaluation_set"
+MODES = ["dynamic", "static"]
+ITERATIONS = 10
+
+def time_batch(processor, frames):
+    """Mediana en ms por frame de ITERATIONS lotes"""
+    timings = []
+    for _ in range(ITERATIONS):
+        start = time.perf_counter()
+        processor.detect_batch(frames, INFERENCE_BATCH_SIZE)
+        timings.append((time.perf_counter() - start) * 1000 / len(frames))
+    return float(np.median(timings))
+
+def load_variant(quantization):
+    manager = ModelManager(backend="onnx", quantization=quantization, warmup_runs=2)
+    manager.load()
+    return manager, YOLOProcessor(manager, cache=ResultCache(enabled=False))
+
+def main():
+    dataset_dir = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_DATASET_DIR
+    print("🧮 Benchmark de cuantización INT8")
+
+    samples = load_labelled_dataset(dataset_dir)
+    if not samples:
+        print(f"❌ No hay imágenes etiquetadas en {dataset_dir}/images")
+        sys.exit(1)
+    print(f"   Conjunto: {dataset_dir} ({len(samples)} imágenes)")
+    frames = [cv2.imread(path) for path, _ in samples[:INFERENCE_BATCH_SIZE]]
+
+    reference_manager, reference = load_variant("none")
+    print(f"\n📏 Referencia FP32: {reference_manager.loaded_path} ({reference_manager.active_backend})")
+    reference_eval = evaluate_detector(reference, dataset_dir)
+    reference_ms = time_batch(reference, frames)
+    print(f"   mAP50 {reference_eval['map50']:.4f}, recall {reference_eval['recall']:.4f}, {reference_ms:.1f} ms/frame")
+
+    for mode in MODES:
+        manager, processor = load_variant(mode)
+        if manager.active_backend != f"onnx-int8-{mode}":
+            print(f"\n⚠️ INT8 {mode}: no disponible ({manager.status()['error'] or manager.active_backend})")
+            continue
+
+        evaluation = evaluate_detector(processor, dataset_dir)
+        delta = compare_evaluations(reference_eval, evaluation)
+        ms = time_batch(processor, frames)
+        print(f"\n⚡ INT8 {mode}: {manager.loaded_path}")
+        print(f"   {ms:.1f} ms/frame ({reference_ms / ms:.2f}x), "
+              f"mAP50 {evaluation['map50']:.4f} ({delta['map50_delta']:+.4f}), "
+              f"recall {evaluation['recall']:.4f} ({delta['recall_delta']:+.4f})")
+        print(f"   {'marca':<24} {'etiquetas':>9} {'Δ AP50':>8} {'Δ recall':>9}")
+        for name, metrics in delta['per_class'].items():
+            print(f"   {name:<24} {metrics['labels']:>9} {metrics['ap50_delta']:>+8.4f} {metrics['recall_delta']:>+9.4f}")
+
+    print("\n✅ Benchmark completado")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Benchmark de extracción de resultados YOLO
+Compara la extracción caja por caja (tres transferencias de tensor por caja)
+con la extracción columnar de DetectionResult para 0, 10 y 100 cajas
+"""
+
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import torch
+from ultralytics.engine.results import Boxes
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.models.yolo_processor import DetectionResult
+
+BOX_COUNTS = [0, 10, 100]
+ITERATIONS = 2000
+IMAGE_SHAPE = (720, 1280)
+NAMES = {i: f"brand_{i}" for i in range(20)}
+
+def create_result(box_count):
+    """Resultado sintético con la misma estructura que devuelve ultralytics"""
+    rng = np.random.default_rng(box_count)
+    xy = rng.uniform(0, 600, (box_count, 2))
+    wh = rng.uniform(10, 200, (box_count, 2))
+    data = np.column_stack([
+        xy, xy + wh,
+        rng.uniform(0.5, 1.0, box_count),
+        rng.integers(0, len(NAMES), box_count)
+    ]).astype(np.float32)
+    return SimpleNamespace(boxes=Boxes(torch.from_numpy(data.reshape(-1, 6)), IMAGE_SHAPE))
+
+def extract_per_box(result):
+    """Extracción original: una transferencia por atributo y por caja"""
+    detections = []
+    for box in result.boxes:
+        x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
+        detections.append({
+            'bbox': [float(x1), float(y1), float(x2), float(y2)],
+            'confidence': float(box.conf[0].cpu().numpy()),
+            'class_id': int(box.cls[0].cpu().numpy()),
+            'class_name': NAMES[int(box.cls[0].cpu().numpy())]
+        })
+    return detections
+
+def time_function(function, result):
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        function(result)
+    return (time.perf_counter() - start) / ITERATIONS * 1e6
+
+def main():
+    print("📦 Benchmark de extracción de resultados")
+    print(f"   {ITERATIONS} iteraciones por caso, tiempos en µs por frame")
+
+    header = f"{'cajas':>6} {'por caja':>10} {'columnar':>10} {'+ dicts':>10} {'mejora':>8}"
+    print(header)
+    print("-" * len(header))
+
+    for box_count in BOX_COUNTS:
+        result = create_result(box_count)
+
+        # Comprobar que ambas extracciones coinciden
+        expected = extract_per_box(result)
+        columnar = DetectionResult.from_ultralytics(result, NAMES).to_dicts()
+        assert len(expected) == len(columnar)
+        for a, b in zip(expected, columnar):
+            assert a['class_name'] == b['class_name']
+            assert np.allclose(a['bbox'], b['bbox']) and abs(a['confidence'] - b['confidence']) < 1e-6
+
+        per_box = time_function(extract_per_box, result)
+        arrays_only = time_function(lambda r: DetectionResult.from_ultralytics(r, NAMES), result)
+        with_dicts = time_function(lambda r: DetectionResult.from_ultralytics(r, NAMES).to_dicts(), result)
+        speedup = per_box / with_dicts if with_dicts else 0.0
+        print(f"{box_count:>6} {per_box:>10.1f} {arrays_only:>10.1f} {with_dicts:>10.1f} {speedup:>7.1f}x")
+
+    print("\n✅ Benchmark completado")
+
+if __name__ == "__main__":
+    main()
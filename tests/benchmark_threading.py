@@ -0,0 +1,83 @@
+"""
+Benchmark de hilos y afinidad de CPU
+Recorre combinaciones de hilos de torch, hilos de OpenCV y pinning de núcleos en este host
+y muestra la mejor configuración por throughput (frames/s) y por latencia (ms por lote)
+"""
+
+import os
+import sys
+import time
+import itertools
+
+import numpy as np
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.core.threading_config import apply_thread_settings, available_cpus, pin_to_cpus
+from backend.core.video_processor import letterbox
+from backend.core.result_cache import ResultCache
+from backend.models.yolo_processor import YOLOProcessor
+from backend.core.config import INFERENCE_BATCH_SIZE, MODEL_INPUT_SIZE
+
+BATCHES = 5
+FRAME_SIZE = (1920, 1080)
+
+def thread_options(cores):
+    """1, 2, 4, ... hasta el número de núcleos"""
+    options = sorted({2 ** i for i in range(int(np.log2(cores)) + 1)} | {cores})
+    return options
+
+def make_frames():
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 255, (FRAME_SIZE[1], FRAME_SIZE[0], 3), dtype=np.uint8) for _ in range(INFERENCE_BATCH_SIZE)]
+
+def run_workload(processor, frames):
+    """Preprocesado con OpenCV + inferencia por lotes; devuelve (frames/s, mediana ms por lote)"""
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(BATCHES):
+        t0 = time.perf_counter()
+        images = [letterbox(frame, MODEL_INPUT_SIZE)[0] for frame in frames]
+        processor.detect_batch(images, INFERENCE_BATCH_SIZE)
+        latencies.append((time.perf_counter() - t0) * 1000)
+    elapsed = time.perf_counter() - start
+    return BATCHES * len(frames) / elapsed, float(np.median(latencies))
+
+def main():
+    cpus = available_cpus()
+    print("🧵 Benchmark de hilos y afinidad")
+    print(f"   Núcleos disponibles: {len(cpus)}, lote de {INFERENCE_BATCH_SIZE} frames {FRAME_SIZE[0]}x{FRAME_SIZE[1]}")
+
+    processor = YOLOProcessor(cache=ResultCache(enabled=False))
+    processor.manager.load()
+    frames = make_frames()
+
+    results = []
+    header = f"{'torch':>6} {'opencv':>7} {'pinned':>7} {'frames/s':>9} {'ms/lote':>8}"
+    print(header)
+    print("-" * len(header))
+
+    for torch_threads, opencv_threads, pinned in itertools.product(
+        thread_options(len(cpus)), [0, 1, len(cpus)], [False, True]
+    ):
+        pin_to_cpus(cpus[:torch_threads] if pinned else cpus)
+        apply_thread_settings(inference_threads=torch_threads, interop_threads=0,
+                              opencv_threads=opencv_threads, cpus=[])
+        run_workload(processor, frames[:1])  # Calentar con la nueva configuración
+        throughput, latency = run_workload(processor, frames)
+        results.append((torch_threads, opencv_threads, pinned, throughput, latency))
+        print(f"{torch_threads:>6} {opencv_threads:>7} {str(pinned):>7} {throughput:>9.1f} {latency:>8.1f}")
+
+    pin_to_cpus(cpus)
+    best_throughput = max(results, key=lambda r: r[3])
+    best_latency = min(results, key=lambda r: r[4])
+    print(f"\n🏆 Mejor throughput: INFERENCE_THREADS={best_throughput[0]} OPENCV_THREADS={best_throughput[1]}"
+          f" pinned={best_throughput[2]} ({best_throughput[3]:.1f} frames/s)")
+    print(f"🏆 Mejor latencia:   INFERENCE_THREADS={best_latency[0]} OPENCV_THREADS={best_latency[1]}"
+          f" pinned={best_latency[2]} ({best_latency[4]:.1f} ms/lote)")
+    print("   Con VIDEO_WORKERS>1 y PIN_WORKERS=true, cada worker usa su parte de los núcleos")
+    print("\n✅ Benchmark completado")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Prueba de paridad entre backends de inferencia
+Comprueba que ONNX Runtime y OpenVINO devuelven las mismas detecciones
+(mismo formato, mismas clases, cajas y confianzas casi iguales) que PyTorch
+"""
+
+import os
+import sys
+
+import cv2
+import numpy as np
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.models.model_manager import ModelManager
+from backend.models.yolo_processor import YOLOProcessor
+from backend.core.result_cache import ResultCache
+from backend.core.tracker import bbox_iou
+
+TEST_IMAGES = ["image.png", "microsoft_logo_test.png"]
+BACKENDS = ["onnx", "openvino"]
+MIN_IOU = 0.9
+MAX_CONFIDENCE_DELTA = 0.05
+DETECTION_KEYS = {'bbox', 'confidence', 'class_id', 'class_name'}
+
+def load_images():
+    """Imágenes de prueba más un frame sintético sin contenido"""
+    images = {"blank": np.zeros((480, 640, 3), dtype=np.uint8)}
+    for path in TEST_IMAGES:
+        if os.path.exists(path):
+            images[path] = cv2.imread(path)
+    return images
+
+def compare_detections(reference, candidate):
+    """Empareja cada detección de referencia con la mejor del candidato; devuelve lista de errores"""
+    errors = []
+    if len(reference) != len(candidate):
+        errors.append(f"{len(reference)} detecciones vs {len(candidate)}")
+
+    for detection in candidate:
+        if set(detection.keys()) != DETECTION_KEYS:
+            errors.append(f"formato distinto: {sorted(detection.keys())}")
+            break
+
+    for expected in reference:
+        same_class = [d for d in candidate if d['class_name'] == expected['class_name']]
+        if not same_class:
+            errors.append(f"falta {expected['class_name']}")
+            continue
+        best = max(same_class, key=lambda d: bbox_iou(expected['bbox'], d['bbox']))
+        iou = bbox_iou(expected['bbox'], best['bbox'])
+        delta = abs(expected['confidence'] - best['confidence'])
+        if iou < MIN_IOU:
+            errors.append(f"{expected['class_name']}: IoU {iou:.3f}")
+        if delta > MAX_CONFIDENCE_DELTA:
+            errors.append(f"{expected['class_name']}: confianza {expected['confidence']:.3f} vs {best['confidence']:.3f}")
+    return errors
+
+def test_backend_parity():
+    """Compara cada backend disponible con PyTorch sobre las imágenes de prueba"""
+    images = load_images()
+    print(f"🖼️ Imágenes de prueba: {list(images.keys())}")
+
+    reference_manager = ModelManager(backend="pytorch", warmup_runs=0, quantization="none")
+    reference_processor = YOLOProcessor(reference_manager, cache=ResultCache(enabled=False))
+    if reference_processor.model is None:
+        print("❌ No se pudo cargar el modelo PyTorch")
+        return False
+
+    reference = {name: list(reference_processor.detect_objects(image)) for name, image in images.items()}
+    reference_batch = [list(d) for d in reference_processor.detect_batch(list(images.values()))]
+
+    all_passed = True
+    for backend in BACKENDS:
+        manager = ModelManager(backend=backend, warmup_runs=0, quantization="none")
+        processor = YOLOProcessor(manager, cache=ResultCache(enabled=False))
+        manager.load()
+        if manager.active_backend != backend:
+            print(f"⚠️ {backend}: no disponible, se omite")
+            continue
+
+        print(f"\n🔍 Backend {backend} ({manager.loaded_path})")
+        for name, image in images.items():
+            errors = compare_detections(reference[name], list(processor.detect_objects(image)))
+            if errors:
+                all_passed = False
+                print(f"   ❌ {name}: {'; '.join(errors)}")
+            else:
+                print(f"   ✅ {name}: {len(reference[name])} detecciones iguales")
+
+        # Inferencia por lotes
+        batch = processor.detect_batch(list(images.values()))
+        batch_errors = [e for ref, det in zip(reference_batch, batch) for e in compare_detections(ref, list(det))]
+        if batch_errors:
+            all_passed = False
+            print(f"   ❌ lote: {'; '.join(batch_errors)}")
+        else:
+            print(f"   ✅ lote de {len(batch)} imágenes igual")
+
+    return all_passed
+
+def main():
+    """Función principal"""
+    print("🚀 Prueba de paridad de backends de inferencia")
+    if test_backend_parity():
+        print("\n🎯 Todos los backends disponibles coinciden con PyTorch")
+    else:
+        print("\n❌ Hay diferencias entre backends")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
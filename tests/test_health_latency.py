@@ -0,0 +1,105 @@
+"""
+Prueba de latencia de /health durante el procesamiento de un video largo
+Requiere la API en marcha (uvicorn main:app). Mide /health en reposo y mientras
+se procesa un video sintético; la latencia debe mantenerse plana porque ni Supabase
+ni el trabajo de CPU bloquean el event loop.
+"""
+
+import os
+import sys
+import time
+import threading
+import tempfile
+from pathlib import Path
+
+import cv2
+import numpy as np
+import requests
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Configuración
+API_BASE_URL = "http://localhost:8000"
+VIDEO_SECONDS = 120
+SAMPLES = 50
+MAX_P95_MS = 100  # Latencia máxima aceptada para /health durante el procesamiento
+MAX_SLOWDOWN = 5  # Y como mucho 5 veces la latencia en reposo
+
+def make_long_video(path, seconds=VIDEO_SECONDS, fps=25, size=(1280, 720)):
+    """Genera un video con un recuadro en movimiento para que haya detecciones que persistir"""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, size)
+    for i in range(seconds * fps):
+        frame = np.full((size[1], size[0], 3), 60, np.uint8)
+        x = (i * 4) % (size[0] - 200)
+        cv2.rectangle(frame, (x, 200), (x + 200, 320), (0, 0, 255), -1)
+        writer.write(frame)
+    writer.release()
+    return path
+
+def measure_health(samples=SAMPLES, interval=0.1):
+    """Latencias de /health en ms"""
+    latencies = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        response = requests.get(f"{API_BASE_URL}/health", timeout=30)
+        latencies.append((time.perf_counter() - start) * 1000)
+        if response.status_code != 200:
+            raise Exception(f"/health devolvió {response.status_code}")
+        time.sleep(interval)
+    return latencies
+
+def upload_video(video_path, done):
+    """Sube el video con /upload (síncrono) y marca done al terminar"""
+    try:
+        with open(video_path, 'rb') as f:
+            files = {'file': (Path(video_path).name, f, 'multipart/form-data')}
+            response = requests.post(f"{API_BASE_URL}/upload", files=files, timeout=3600)
+        print(f"  Upload terminado: {response.status_code}")
+    except Exception as e:
+        print(f"❌ Error en upload: {e}")
+    finally:
+        done.set()
+
+def test_health_latency_during_processing():
+    """La latencia de /health no crece mientras se procesa un video"""
+    try:
+        requests.get(f"{API_BASE_URL}/health", timeout=5)
+    except Exception as e:
+        print(f"❌ API no disponible en {API_BASE_URL}: {e}")
+        return False
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"🎬 Generando video de {VIDEO_SECONDS}s...")
+        video_path = make_long_video(os.path.join(tmp, "long_video.mp4"))
+
+        idle = measure_health()
+        idle_p95 = float(np.percentile(idle, 95))
+        print(f"💤 /health en reposo: mediana {np.median(idle):.1f} ms, p95 {idle_p95:.1f} ms")
+
+        done = threading.Event()
+        uploader = threading.Thread(target=upload_video, args=(video_path, done), daemon=True)
+        uploader.start()
+        time.sleep(2)  # Dar tiempo a que empiece el procesamiento
+
+        busy = measure_health()
+        if done.is_set():
+            print("⚠️ El video terminó antes de medir; aumenta VIDEO_SECONDS")
+        busy_p95 = float(np.percentile(busy, 95))
+        print(f"🔥 /health procesando: mediana {np.median(busy):.1f} ms, p95 {busy_p95:.1f} ms, máx {max(busy):.1f} ms")
+        uploader.join()
+
+    if busy_p95 <= max(MAX_P95_MS, idle_p95 * MAX_SLOWDOWN):
+        print("✅ La latencia de /health se mantiene plana durante el procesamiento")
+        return True
+    print(f"❌ /health se degrada durante el procesamiento (p95 {busy_p95:.1f} ms)")
+    return False
+
+def main():
+    """Función principal"""
+    print("🚀 Prueba de latencia de /health")
+    success = test_health_latency_during_processing()
+    sys.exit(0 if success else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Prueba de seguimiento con ambos modos de muestreo
+Una aparición continua de un logo debe producir un único track tanto con muestreo
+fijo (TARGET_FPS) como adaptativo, aunque el muestreo adaptativo refine hacia atrás
+en el tiempo. Usa videos sintéticos y un detector de color, sin modelo ni Supabase.
+Se ejecuta con pytest o directamente (python tests/test_tracking_sampling.py).
+"""
+
+import os
+import sys
+import tempfile
+
+import cv2
+import numpy as np
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.core.config import TARGET_FPS, INFERENCE_BATCH_SIZE
+from backend.core.tracker import DetectionTracker
+from backend.core.adaptive_sampler import AdaptiveSampler
+from backend.core.video_processor import video_processor
+
+VIDEO_FPS = 30
+# (duración del video, segundos en los que el logo es visible)
+CLIPS = [
+    (14, (2.0, 10.0)),
+    # El último lote del muestreo adaptativo tiene frames a ambos lados del final del track
+    (20, (3.0, 12.0)),
+]
+
+def make_video(path, seconds, logo_span, fps=VIDEO_FPS, size=(640, 360)):
+    """Genera un video con un recuadro rojo fijo visible durante logo_span"""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, size)
+    for i in range(seconds * fps):
+        frame = np.full((size[1], size[0], 3), 60, np.uint8)
+        if logo_span[0] <= i / fps < logo_span[1]:
+            cv2.rectangle(frame, (120, 100), (200, 160), (0, 0, 255), -1)
+        writer.write(frame)
+    writer.release()
+    return path
+
+def detect_red(frames):
+    """Detector de prueba: una detección 'logo' por región roja"""
+    results = []
+    for frame in frames:
+        mask = cv2.inRange(frame, (0, 0, 180), (80, 80, 255))
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        detections = []
+        for contour in contours:
+            x, y, w, h = cv2.boundingRect(contour)
+            if w * h >= 100:
+                detections.append({'bbox': [float(x), float(y), float(x + w), float(y + h)],
+                                   'confidence': 0.9, 'class_id': 0, 'class_name': 'logo'})
+        results.append(detections)
+    return results
+
+def crop_box(frame, bbox):
+    """Recorte sin margen"""
+    x1, y1, x2, y2 = (int(v) for v in bbox)
+    return frame[y1:y2, x1:x2]
+
+def track_fixed(video_path):
+    """Muestreo fijo a TARGET_FPS, frames en orden"""
+    tracker = DetectionTracker(crop=crop_box)
+    tracks = []
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    interval = video_processor.get_frame_interval(fps, TARGET_FPS)
+    frame_idx = 0
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if frame_idx % interval == 0:
+            tracker.update(frame_idx, frame_idx / fps, frame, detect_red([frame])[0], interval / fps)
+            tracks.extend(tracker.close_before())
+        frame_idx += 1
+    cap.release()
+    return tracks + tracker.finish()
+
+def track_adaptive(video_path):
+    """Muestreo adaptativo como en ProcessingService: todo el lote al tracker, luego cierre hasta el instante ya cerrado"""
+    tracker = DetectionTracker(crop=crop_box)
+    sampler = AdaptiveSampler(batch_size=INFERENCE_BATCH_SIZE)
+    tracks = []
+    for batch, batch_detections in sampler.iter_results(video_path, detect_red):
+        horizon = sampler.pop_settled_timestamp(batch)
+        for (frame_idx, timestamp, frame), detections in zip(batch, batch_detections):
+            tracker.update(frame_idx, timestamp, frame, detections, sampler.sample_interval(frame_idx))
+        tracks.extend(tracker.close_before(horizon))
+    return tracks + tracker.finish()
+
+def check_single_track(mode, run):
+    """Una aparición continua -> un track, en cada video de prueba"""
+    with tempfile.TemporaryDirectory() as tmp:
+        for seconds, logo_span in CLIPS:
+            video_path = make_video(os.path.join(tmp, f"logo_{seconds}s.mp4"), seconds, logo_span)
+            tracks = run(video_path)
+            spans = [(round(t['t_first'], 2), round(t['t_end'], 2)) for t in tracks]
+            assert len(tracks) == 1, f"{mode}, logo {logo_span} en {seconds}s: {len(tracks)} tracks {spans}"
+            print(f"✅ {mode}, logo {logo_span} en {seconds}s: 1 track {spans[0]}")
+
+def test_single_track_fixed_sampling():
+    check_single_track("fixed", track_fixed)
+
+def test_single_track_adaptive_sampling():
+    check_single_track("adaptive", track_adaptive)
+
+def main():
+    """Función principal"""
+    print("🚀 Prueba de seguimiento con muestreo fijo y adaptativo")
+    success = True
+    for test in (test_single_track_fixed_sampling, test_single_track_adaptive_sampling):
+        try:
+            test()
+        except AssertionError as e:
+            print(f"❌ {e}")
+            success = False
+    sys.exit(0 if success else 1)
+
+if __name__ == "__main__":
+    main()